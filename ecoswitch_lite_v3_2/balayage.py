@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+# Balayage « what-if » : agrégats, verdicts et EcoScores sur une grille
+# UA × T_confort × T_depart × prix élec × prix gaz, en une passe NumPy.
+#
+# Le besoin est linéaire en UA (E = UA · dT), donc toutes les sommes horaires se
+# calculent une fois par (T_confort, T_depart) puis sont mises à l'échelle.
+# L'hybride reprend l'idée du registre énergétique : heures triées par COP dans
+# chaque période tarifaire, sommes suffixes, et un searchsorted par point de prix.
+# Écart à simulate_chauffage : pas d'arrondi horaire à 1e-4 kWh (écart négligeable).
+# Pas d'hybride piloté : son planning dépend de chaque point de la grille (programmation
+# dynamique sur toute la saison) ; verdicts limités à VERDICTS_SANS_PILOTAGE (codes 0 à 2).
+import numpy as np
+
+from meteo_data import tableaux_meteo
+from noyau_calcul import CO2_ELEC, CO2_GAZ, ecart_temperature, cop_median
+from modele_cop import cop_horaire
+from tarifs import grille_tarifaire, periodes_horaires, calendrier_client
+from verdict_engine import codes_verdict
+from eco_score import ecoscores
+
+AXES = ("ua_w_k", "t_confort", "t_depart_pac", "prix_elec", "prix_gaz")
+
+def _suffixes(x):
+    """Sommes suffixes sur le dernier axe, avec un 0 final (somme vide)."""
+    s = np.cumsum(x[..., ::-1], axis=-1)[..., ::-1]
+    return np.concatenate([s, np.zeros(x.shape[:-1] + (1,))], axis=-1)
+
+def valeurs_axes(client: dict, **axes) -> dict:
+    """
+    Valeurs de chaque axe (valeur du client si l'axe n'est pas balayé).
+    prix_elec : €/kWh en tarif base ; en HP/HC ou Tempo, facteur appliqué à la grille tarifaire.
+    """
+    base = client.get("mode_tarif", "base") not in ("hp_hc", "tempo")
+    defauts = {
+        "ua_w_k": client["ua_w_k"],
+        "t_confort": client["t_confort"],
+        "t_depart_pac": client.get("t_depart_pac", 50),
+        "prix_elec": client["prix_elec_eur_kwh"] if base else 1.0,
+        "prix_gaz": client["prix_gaz_eur_kwh"],
+    }
+    inconnus = set(axes) - set(AXES)
+    if inconnus:
+        raise ValueError("Axes inconnus : {} (attendus : {})".format(sorted(inconnus), AXES))
+    return {k: np.atleast_1d(np.asarray(axes.get(k, defauts[k]), dtype=float)) for k in AXES}
+
+def balayer(client: dict, meteo, **axes) -> dict:
+    """
+    Évalue toute la grille. Retourne :
+    - "axes" : valeurs de chaque axe (ordre AXES) ;
+    - une clé par agrégat (mêmes clés que simulate_chauffage), tableaux de forme
+      (n_ua, n_t_confort, n_t_depart, n_prix_elec, n_prix_gaz) ;
+    - "code_verdict" (indice dans VERDICTS_SANS_PILOTAGE), "ecoscore", "frontiere" (cellule dont
+      le verdict diffère d'une voisine).
+    """
+    v = valeurs_axes(client, **axes)
+    ua, tc, td, pe, pg = (v[k] for k in AXES)
+    dates, t_ext = tableaux_meteo(meteo)
+    t_ext = np.asarray(t_ext, dtype=float)
+    eta = float(client["rendement_chaudiere"])
+
+    tarif = grille_tarifaire(client)
+    codes = periodes_horaires(tarif, dates, calendrier_client(client))
+    nb = len(tarif["periodes"])
+    prix_ref = np.ones(nb) if tarif["mode"] == "base" else tarif["prix"]
+    prix = pe[:, None] * prix_ref[None, :]                       # (PE, B)
+
+    # Heures triées par (période, COP) pour chaque T_depart
+    cop = cop_horaire(client, t_ext[None, :], td[:, None])       # (D, H)
+    ordre = np.lexsort((cop, np.broadcast_to(codes, cop.shape)), axis=-1)
+    cop_t = np.take_along_axis(cop, ordre, axis=-1)
+    bornes = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=nb))])
+
+    d_t = ecart_temperature(tc[:, None], t_ext)                  # (T, H)
+    d_t_tri = d_t[:, ordre]                                      # (T, D, H)
+    su = _suffixes(d_t_tri)                                      # besoin (K·h) par suffixe
+    se = _suffixes(d_t_tri / cop_t[None])                        # élec PAC par suffixe
+    lo, hi = bornes[:-1], bornes[1:]
+    utile_b = su[..., lo] - su[..., hi]                          # (T, D, B)
+    elec_b = se[..., lo] - se[..., hi]
+
+    # Hybride : une heure passe en PAC si COP >= prix_elec · eta / prix_gaz
+    with np.errstate(divide="ignore"):
+        seuil = prix[:, None, :] * eta / pg[None, :, None]       # (PE, PG, B)
+    bascule = np.empty((len(td),) + seuil.shape, dtype=np.intp)  # (D, PE, PG, B)
+    for b in range(nb):
+        for d in range(len(td)):
+            bascule[d, ..., b] = lo[b] + np.searchsorted(cop_t[d, lo[b]:hi[b]], seuil[..., b], side="left")
+    idx_d = np.arange(len(td))[:, None, None, None]
+    utile_pac = (su[:, idx_d, bascule] - su[:, idx_d, hi]).sum(axis=-1)   # (T, D, PE, PG)
+    elec_hyb_b = se[:, idx_d, bascule] - se[:, idx_d, hi]                # (T, D, PE, PG, B)
+
+    # Mise à l'échelle par UA et diffusion sur (A, T, D, PE, PG)
+    k = (ua / 1000.0)[:, None, None, None, None]
+    utile_tot = k * utile_b.sum(axis=-1)[:, 0][None, :, None, None, None]
+    elec_pac = k * elec_b.sum(axis=-1)[None, :, :, None, None]
+    cout_pac = k * np.einsum("tdb,pb->tdp", elec_b, prix)[..., None][None]
+    gaz_in = utile_tot / eta
+    u_pac = k * utile_pac[None]
+    elec_hyb = k * elec_hyb_b.sum(axis=-1)[None]
+    gaz_hyb = (utile_tot - u_pac) / eta
+    pg5 = pg[None, None, None, None, :]
+    cout_hyb = k * np.einsum("tdpgb,pb->tdpg", elec_hyb_b, prix)[None] + gaz_hyb * pg5
+
+    forme = (len(ua), len(tc), len(td), len(pe), len(pg))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        part = np.where(utile_tot > 0, 100.0 * u_pac / utile_tot, 0.0)
+    cop_med = cop_median(np.broadcast_to(d_t[:, None, :], d_t_tri.shape), cop[None])  # (T, D)
+    res = {
+        "energie_utile_kWh": utile_tot,
+        "cop_median": cop_med[None, :, :, None, None],
+        "energie_in_pac_kWh": elec_pac,
+        "cout_pac_eur": cout_pac,
+        "co2_pac_kg": elec_pac * CO2_ELEC,
+        "energie_in_gaz_kWh": gaz_in,
+        "cout_gaz_eur": gaz_in * pg5,
+        "co2_gaz_kg": gaz_in * CO2_GAZ,
+        "energie_in_hybride_elec_kWh": elec_hyb,
+        "energie_in_hybride_gaz_kWh": gaz_hyb,
+        "cout_hybride_eur": cout_hyb,
+        "co2_hybride_kg": elec_hyb * CO2_ELEC + gaz_hyb * CO2_GAZ,
+        "part_utile_pac_hybride_%": part,
+    }
+    res = {cle: np.broadcast_to(val, forme) for cle, val in res.items()}
+    res["code_verdict"] = codes_verdict(res["cout_pac_eur"], res["cout_gaz_eur"],
+                                        res["cout_hybride_eur"], res["cop_median"])
+    res["ecoscore"] = ecoscores(res["cout_gaz_eur"], res["cout_hybride_eur"],
+                                res["co2_gaz_kg"], res["co2_hybride_kg"])
+    res["frontiere"] = frontiere(res["code_verdict"])
+    res["axes"] = v
+    return res
+
+def frontiere(codes) -> np.ndarray:
+    """Cellules dont le verdict diffère d'au moins une voisine (sur n'importe quel axe)."""
+    f = np.zeros(codes.shape, dtype=bool)
+    for ax in range(codes.ndim):
+        if codes.shape[ax] < 2:
+            continue
+        diff = np.diff(codes, axis=ax) != 0
+        avant = [slice(None)] * codes.ndim
+        apres = [slice(None)] * codes.ndim
+        avant[ax], apres[ax] = slice(None, -1), slice(1, None)
+        f[tuple(avant)] |= diff
+        f[tuple(apres)] |= diff
+    return f
+
+def coupe_2d(res: dict, axe_x: str, axe_y: str, cle: str = "code_verdict") -> np.ndarray:
+    """Tableau (n_y, n_x) d'une grille où seuls axe_x et axe_y ont plus d'une valeur."""
+    ix, iy = AXES.index(axe_x), AXES.index(axe_y)
+    z = res[cle]
+    autres = tuple(i for i in range(z.ndim) if i not in (ix, iy))
+    if any(z.shape[i] != 1 for i in autres):
+        raise ValueError("coupe_2d : les axes hors (x, y) doivent avoir une seule valeur")
+    z = z.reshape([z.shape[i] for i in sorted((ix, iy))])
+    return z if iy < ix else z.T
+
+def points_frontiere(res: dict, axe_x: str, axe_y: str):
+    """Points (x, y) au milieu de chaque paire de cellules voisines de verdicts différents."""
+    z = coupe_2d(res, axe_x, axe_y)
+    x, y = res["axes"][axe_x], res["axes"][axe_y]
+    xs, ys = [], []
+    jy, jx = np.nonzero(np.diff(z, axis=1) != 0)
+    xs.append((x[jx] + x[jx + 1]) / 2); ys.append(y[jy])
+    jy, jx = np.nonzero(np.diff(z, axis=0) != 0)
+    xs.append(x[jx]); ys.append((y[jy] + y[jy + 1]) / 2)
+    return np.concatenate(xs), np.concatenate(ys)
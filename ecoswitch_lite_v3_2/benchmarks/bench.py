@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+# Banc de performance : données synthétiques à l'échelle réelle, temps (médian et
+# meilleur) et pic mémoire (tracemalloc) par étape, comparaison à une référence JSON.
+# La régression de temps porte sur le meilleur temps, moins sensible au bruit.
+# Les étapes « demarrage[...] » mesurent un processus Python neuf (imports à froid
+# de la CLI et des workers).
+#
+#   python -m benchmarks.bench                 # compare à benchmarks/baseline.json
+#   python -m benchmarks.bench --enregistrer   # (ré)écrit la référence
+#   python -m benchmarks.bench --rapide --seuil 0.5 --etapes simulate
+#
+# Code de sortie 1 si une étape régresse au-delà du seuil (temps ou mémoire).
+# Les références dépendent de la machine : les régénérer sur la machine de mesure.
+import os
+import sys
+import json
+import time
+import shutil
+import pathlib
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.generateurs import (meteo_synthetique, calendrier_tempo_synthetique, clients_synthetiques,
+                                    ecrire_meteo_csv, ecrire_clients_jsonl)
+
+DOSSIER = pathlib.Path(__file__).resolve().parent
+SEUIL = 0.25           # +25 % de meilleur temps ou de pic mémoire = régression
+PLANCHER_S = 0.005     # écarts de temps inférieurs ignorés (bruit de mesure)
+PLANCHER_MO = 1.0      # écarts de mémoire inférieurs ignorés
+DUREE_MIN_S = 0.5      # répétitions jusqu'à cette durée cumulée...
+REPETITIONS = (3, 50)  # ... entre ces bornes
+
+def _client(mode: str, calendrier: str) -> dict:
+    c = {"nom": "Bench", "code_postal": "69000", "ua_w_k": 230.0, "t_confort": 20.0,
+         "rendement_chaudiere": 0.92, "mode_tarif": mode, "prix_elec_eur_kwh": 0.22,
+         "prix_gaz_eur_kwh": 0.11, "t_depart_pac": 50}
+    if mode == "tempo":
+        c["calendrier_tempo"] = calendrier
+    return c
+
+def preparer(dossier: str, rapide: bool = False) -> dict:
+    """Écrit les jeux de données synthétiques ; retourne leurs chemins et tailles."""
+    annees = 2 if rapide else 5
+    n_clients = 1000 if rapide else 10000
+    m1 = meteo_synthetique(1)
+    mn = meteo_synthetique(annees, graine=1)
+    p = {
+        "meteo_1an": os.path.join(dossier, "meteo_8760h.csv"),
+        "meteo_multi": os.path.join(dossier, "meteo_{}ans.csv".format(annees)),
+        "stockage": os.path.join(dossier, "stockage"),
+        "calendrier": os.path.join(dossier, "calendrier_tempo.json"),
+        "clients": os.path.join(dossier, "clients.jsonl"),
+        "cache": os.path.join(dossier, "cache.sqlite"),
+        "annees": annees,
+        "n_clients": n_clients,
+    }
+    ecrire_meteo_csv(m1, p["meteo_1an"])
+    ecrire_meteo_csv(mn, p["meteo_multi"])
+    with open(p["calendrier"], "w", encoding="utf-8") as f:
+        json.dump(calendrier_tempo_synthetique(mn), f)
+    ecrire_clients_jsonl(clients_synthetiques(n_clients, calendrier_tempo=p["calendrier"]), p["clients"])
+    # Entrées de « python main.py » (chemins relatifs au répertoire courant)
+    os.makedirs(os.path.join(dossier, "data"))
+    shutil.copy(ROOT / "demo_client.json", dossier)
+    shutil.copy(ROOT / "data" / "meteo_demo.csv", os.path.join(dossier, "data"))
+
+    from stockage_meteo import ajouter_station
+    ajouter_station(p["stockage"], "SYN", mn.index.values.astype("datetime64[s]").astype(np.int64), mn["t_ext"].to_numpy())
+    return p
+
+def _processus(*args):
+    """Lance un interpréteur neuf (sortie ignorée) ; échec si le code de retour est non nul."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    return lambda: subprocess.run([sys.executable] + list(args), env=env, check=True, stdout=subprocess.DEVNULL)
+
+def etapes(p: dict) -> list:
+    """(nom, fonction sans argument) ; les entrées sont chargées une fois ici."""
+    from meteo_data import load_meteo, lire_meteo
+    from simulateur import simulate_chauffage, simuler_agregats
+    from verdict_engine import recommander_solution
+    from eco_score import calculer_ecoscore
+    from rapport_client import generer_rapport, horaires_en_octets
+    from registre_energie import reevaluer
+    from flotte import simuler_flotte
+    from cache_resultats import CacheResultats
+    from sous_echantillonnage import lttb, POINTS_MAX
+    from client_data import load_clients
+    from monte_carlo import simuler_incertitudes
+    from balayage import balayer
+
+    m1 = load_meteo(p["meteo_1an"])
+    mn = load_meteo(p["meteo_multi"])
+    clients = load_clients(p["clients"])
+    base = _client("base", p["calendrier"])
+    res = simulate_chauffage(base, m1)
+    verdict = recommander_solution(res, base)
+    score = calculer_ecoscore(res)
+    pilote = dict(base, mode_tarif="hp_hc", capacite_thermique_kwh_k=20.0)
+    cache = CacheResultats(p["cache"])  # rempli par l'échauffement de mesurer
+    a = "{} ans".format(p["annees"])
+
+    e = [
+        ("demarrage[python main.py]", _processus(str(ROOT / "main.py"))),
+        ("demarrage[import flotte_parallele]", _processus("-c", "import flotte_parallele")),
+        ("load_meteo[8760 h]", lambda: load_meteo(p["meteo_1an"])),
+        ("load_meteo[{}]".format(a), lambda: load_meteo(p["meteo_multi"])),
+        ("load_meteo[stockage {}]".format(a), lambda: load_meteo(p["stockage"], "SYN")),
+        ("lire_meteo[{}]".format(a), lambda: lire_meteo(p["meteo_multi"])),
+    ]
+    for mode in ("base", "hp_hc", "tempo"):
+        c = _client(mode, p["calendrier"])
+        e.append(("simulate_chauffage[{}, 8760 h]".format(mode), lambda c=c: simulate_chauffage(c, m1)))
+    tempo = _client("tempo", p["calendrier"])
+    e += [
+        ("simulate_chauffage[tempo, {}]".format(a), lambda: simulate_chauffage(tempo, mn)),
+        ("simuler_agregats[tempo, {}]".format(a), lambda: simuler_agregats(tempo, mn)),
+        ("recommander_solution+calculer_ecoscore", lambda: (recommander_solution(res, base), calculer_ecoscore(res))),
+        ("generer_rapport[8760 h]", lambda: generer_rapport(base, res, verdict, score)),
+    ]
+    cumul = np.cumsum(simulate_chauffage(tempo, mn)["horaires"]["Cout_pac_eur"].to_numpy())
+    e.append(("lttb[{} → {} points]".format(a, POINTS_MAX), lambda: lttb(mn.index.values, cumul, POINTS_MAX)))
+    for fmt in ("csv.gz", "parquet"):
+        e.append(("horaires_en_octets[{}, 8760 h]".format(fmt), lambda fmt=fmt: horaires_en_octets(res["horaires"], fmt)))
+    e += [
+        ("reevaluer[registre 8760 h]", lambda: reevaluer(res["registre"], 0.25, 0.12)),
+        ("pilotage[hp_hc, 8760 h]", lambda: simulate_chauffage(pilote, m1, horaires=False)),
+        ("monte_carlo[10000 tirages]", lambda: simuler_incertitudes(base, m1, 10000, graine=0)),
+        ("balayage[40×40]", lambda: balayer(base, m1, ua_w_k=np.linspace(80, 450, 40),
+                                            prix_gaz=np.linspace(0.04, 0.25, 40))),
+        ("simuler_flotte[{} clients, 8760 h]".format(p["n_clients"]), lambda: simuler_flotte(clients, m1)),
+        ("simuler_flotte[{} clients, cache chaud]".format(p["n_clients"]),
+         lambda: simuler_flotte(clients, m1, cache=cache)),
+    ]
+    return e
+
+def mesurer(fonction) -> dict:
+    fonction()  # échauffement (caches de tarifs, imports paresseux)
+    durees, total = [], 0.0
+    while len(durees) < REPETITIONS[0] or (total < DUREE_MIN_S and len(durees) < REPETITIONS[1]):
+        t0 = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - t0)
+        total += durees[-1]
+    tracemalloc.start()
+    fonction()
+    pic = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"mediane_s": float(np.median(durees)), "min_s": min(durees), "repetitions": len(durees),
+            "pic_memoire_mo": pic / 1e6}
+
+def machine() -> dict:
+    import pandas as pd
+    return {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "plateforme": platform.platform(), "processeur": platform.processor(), "coeurs": os.cpu_count()}
+
+def executer(rapide: bool = False, filtre: str = None) -> dict:
+    dossier = tempfile.mkdtemp(prefix="ecoswitch_bench_")
+    cwd = os.getcwd()
+    try:
+        p = preparer(dossier, rapide)
+        os.chdir(dossier)  # generer_rapport écrit dans le répertoire courant
+        resultats = {}
+        for nom, f in etapes(p):
+            if filtre and filtre not in nom:
+                continue
+            resultats[nom] = mesurer(f)
+            r = resultats[nom]
+            print("{:<45} {:>10.2f} ms  {:>8.1f} Mo".format(nom, 1e3 * r["mediane_s"], r["pic_memoire_mo"]), flush=True)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(dossier, ignore_errors=True)
+    return {"version": 1, "rapide": rapide, "machine": machine(), "etapes": resultats}
+
+def comparer(resultats: dict, reference: dict, seuil: float = SEUIL) -> list:
+    """Liste des régressions : (étape, mesure, référence, actuel, ratio)."""
+    regressions = []
+    for nom, r in resultats["etapes"].items():
+        ref = reference.get("etapes", {}).get(nom)
+        if ref is None:
+            continue
+        for cle, plancher in (("min_s", PLANCHER_S), ("pic_memoire_mo", PLANCHER_MO)):
+            if r[cle] > ref[cle] * (1 + seuil) and r[cle] - ref[cle] > plancher:
+                regressions.append((nom, cle, ref[cle], r[cle], r[cle] / ref[cle] if ref[cle] else float("inf")))
+    return regressions
+
+def _args():
+    a = argparse.ArgumentParser(description="Banc de performance EcoSwitch Lite")
+    a.add_argument("--baseline", help="référence JSON (défaut : benchmarks/baseline[_rapide].json)")
+    a.add_argument("--enregistrer", action="store_true", help="écrit les mesures comme nouvelle référence")
+    a.add_argument("--seuil", type=float, default=SEUIL, help="régression tolérée (0.25 = +25 %%)")
+    a.add_argument("--rapide", action="store_true", help="jeux réduits (1000 clients, 2 ans)")
+    a.add_argument("--etapes", help="ne mesure que les étapes dont le nom contient ce texte")
+    a.add_argument("--sortie", help="écrit aussi les mesures dans ce fichier JSON")
+    return a.parse_args()
+
+def main() -> int:
+    args = _args()
+    path_ref = args.baseline or str(DOSSIER / ("baseline_rapide.json" if args.rapide else "baseline.json"))
+    resultats = executer(args.rapide, args.etapes)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            json.dump(resultats, f, indent=1, ensure_ascii=False)
+    if args.enregistrer:
+        if args.etapes and os.path.exists(path_ref):  # mise à jour partielle de la référence
+            with open(path_ref, "r", encoding="utf-8") as f:
+                ref = json.load(f)
+            ref["etapes"].update(resultats["etapes"])
+            ref["machine"] = resultats["machine"]
+            resultats = ref
+        with open(path_ref, "w", encoding="utf-8") as f:
+            json.dump(resultats, f, indent=1, ensure_ascii=False)
+        print("✅ Référence écrite :", path_ref)
+        return 0
+    if not os.path.exists(path_ref):
+        print("ℹ️ Pas de référence ({}) : lancer avec --enregistrer".format(path_ref))
+        return 0
+    with open(path_ref, "r", encoding="utf-8") as f:
+        reference = json.load(f)
+    if reference.get("machine", {}).get("plateforme") != resultats["machine"]["plateforme"]:
+        print("⚠️ Référence mesurée sur une autre machine :", reference.get("machine", {}).get("plateforme"))
+    regressions = comparer(resultats, reference, args.seuil)
+    for nom, cle, ref, val, ratio in regressions:
+        print("❌ {} — {} : {:.4g} -> {:.4g} (×{:.2f})".format(nom, cle, ref, val, ratio))
+    if regressions:
+        return 1
+    print("✅ Aucune régression au-delà de {:.0f} %".format(100 * args.seuil))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# Générateur de charge du service HTTP (service.py), en local : connexions keep-alive
+# concurrentes, latence de chaque requête, percentiles et débit.
+#
+#   python -m benchmarks.charge --demarrer                      # lance le service (météo 1 an synthétique)
+#   python -m benchmarks.charge --url http://127.0.0.1:8765 --requetes 20000 --connexions 128
+#   python -m benchmarks.charge --demarrer --mode lot --taille-lot 100
+#   python -m benchmarks.charge --demarrer --mode flux --requetes 10000
+#
+# Modes : unitaire (un client par requête, regroupés en micro-lots par le service),
+# lot (taille_lot clients par requête), flux (NDJSON, une requête par connexion).
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import pathlib
+import argparse
+import tempfile
+import subprocess
+from urllib.parse import urlsplit
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.generateurs import meteo_synthetique, clients_synthetiques, ecrire_meteo_csv
+
+CHEMINS = {"unitaire": "/simuler", "lot": "/simuler/lot", "flux": "/simuler/flux"}
+
+async def _requete(reader, writer, hote: str, chemin: str, corps: bytes) -> tuple:
+    """POST keep-alive ; retourne (statut, corps de la réponse)."""
+    writer.write("POST {} HTTP/1.1\r\nHost: {}\r\nContent-Length: {}\r\n\r\n".format(
+        chemin, hote, len(corps)).encode("latin-1") + corps)
+    await writer.drain()
+    entete = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+    statut = int(entete.split(" ", 2)[1])
+    entetes = {l.partition(":")[0].strip().lower(): l.partition(":")[2].strip() for l in entete.split("\r\n")[1:]}
+    if entetes.get("transfer-encoding") == "chunked":
+        morceaux = []
+        while True:
+            taille = int((await reader.readuntil(b"\r\n"))[:-2], 16)
+            morceaux.append((await reader.readexactly(taille + 2))[:-2])
+            if taille == 0:
+                return statut, b"".join(morceaux)
+    return statut, await reader.readexactly(int(entetes["content-length"]))
+
+async def _connexion(url, chemin: str, corps: list, latences: list, erreurs: list):
+    """Envoie les corps l'un après l'autre sur une connexion, en mesurant chaque requête."""
+    reader, writer = await asyncio.open_connection(url.hostname, url.port)
+    try:
+        for c in corps:
+            t0 = time.perf_counter()
+            statut, reponse = await _requete(reader, writer, url.netloc, chemin, c)
+            latences.append(time.perf_counter() - t0)
+            if statut != 200:
+                erreurs.append(reponse.decode("utf-8", "replace"))
+    finally:
+        writer.close()
+
+def _corps(clients: list, mode: str, taille_lot: int, connexions: int) -> list:
+    if mode == "unitaire":
+        return [json.dumps(c, ensure_ascii=False).encode("utf-8") for c in clients]
+    if mode == "lot":
+        return [json.dumps(clients[i:i + taille_lot], ensure_ascii=False).encode("utf-8")
+                for i in range(0, len(clients), taille_lot)]
+    part = -(-len(clients) // connexions)
+    return ["".join(json.dumps(c, ensure_ascii=False) + "\n" for c in clients[i:i + part]).encode("utf-8")
+            for i in range(0, len(clients), part)]
+
+async def charger(url: str, clients: list, mode: str = "unitaire", connexions: int = 64,
+                  taille_lot: int = 100) -> dict:
+    """Rejoue les clients contre le service ; latences (ms) par requête et débit."""
+    u = urlsplit(url)
+    corps = _corps(clients, mode, taille_lot, connexions)
+    connexions = min(connexions, len(corps))
+    latences, erreurs = [], []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_connexion(u, CHEMINS[mode], corps[i::connexions], latences, erreurs)
+                           for i in range(connexions)))
+    duree = time.perf_counter() - t0
+    ms = 1e3 * np.array(latences)
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99]) if len(ms) else (float("nan"),) * 3
+    return {"mode": mode, "requetes": len(latences), "clients": len(clients), "connexions": connexions,
+            "erreurs": len(erreurs), "secondes": duree,
+            "requetes_par_s": len(latences) / duree, "clients_par_s": len(clients) / duree,
+            "latence_ms": {"p50": p50, "p90": p90, "p99": p99, "max": float(ms.max()) if len(ms) else float("nan")},
+            "exemple_erreur": erreurs[0] if erreurs else None}
+
+def demarrer_service(path_meteo: str, lot_max: int = None, attente_ms: float = None) -> tuple:
+    """Lance service.py sur un port libre ; retourne (processus, url)."""
+    cmd = [sys.executable, str(ROOT / "service.py"), "--meteo", path_meteo, "--port", "0"]
+    if lot_max is not None:
+        cmd += ["--lot-max", str(lot_max)]
+    if attente_ms is not None:
+        cmd += ["--attente-ms", str(attente_ms)]
+    proc = subprocess.Popen(cmd, cwd=str(ROOT), stdout=subprocess.PIPE, text=True)
+    for ligne in proc.stdout:
+        if "http://" in ligne:
+            return proc, ligne[ligne.index("http://"):].strip()
+    proc.wait()
+    raise RuntimeError("Le service ne s'est pas lancé (code {})".format(proc.returncode))
+
+def afficher(r: dict):
+    l = r["latence_ms"]
+    print("Mode {} : {} requêtes ({} clients) sur {} connexions en {:.2f} s, {} erreur(s)".format(
+        r["mode"], r["requetes"], r["clients"], r["connexions"], r["secondes"], r["erreurs"]))
+    print("Débit : {:.0f} requêtes/s, {:.0f} clients/s".format(r["requetes_par_s"], r["clients_par_s"]))
+    print("Latence (ms) : p50 {:.1f} | p90 {:.1f} | p99 {:.1f} | max {:.1f}".format(l["p50"], l["p90"], l["p99"], l["max"]))
+    if r["exemple_erreur"]:
+        print("Exemple d'erreur :", r["exemple_erreur"])
+
+def _args():
+    a = argparse.ArgumentParser(description="Générateur de charge du service EcoSwitch Lite")
+    a.add_argument("--url", help="service déjà lancé (ex. http://127.0.0.1:8765)")
+    a.add_argument("--demarrer", action="store_true", help="lance le service sur un port libre le temps du test")
+    a.add_argument("--meteo", help="avec --demarrer : météo du service (défaut : 1 an synthétique)")
+    a.add_argument("--lot-max", type=int, help="avec --demarrer : clients par micro-lot du service")
+    a.add_argument("--attente-ms", type=float, help="avec --demarrer : attente de regroupement du service")
+    a.add_argument("--mode", choices=list(CHEMINS), default="unitaire")
+    a.add_argument("--requetes", type=int, default=5000, help="nombre de clients envoyés")
+    a.add_argument("--connexions", type=int, default=64, help="connexions concurrentes")
+    a.add_argument("--taille-lot", type=int, default=100, help="mode lot : clients par requête")
+    a.add_argument("--graine", type=int, default=0)
+    a.add_argument("--json", help="écrit le résultat en JSON")
+    return a.parse_args()
+
+def main() -> int:
+    args = _args()
+    if not args.url and not args.demarrer:
+        print("Préciser --url ou --demarrer", file=sys.stderr)
+        return 2
+    dossier, proc, url = None, None, args.url
+    try:
+        if args.demarrer:
+            path_meteo = args.meteo
+            if path_meteo is None:
+                dossier = tempfile.mkdtemp(prefix="ecoswitch_charge_")
+                path_meteo = os.path.join(dossier, "meteo_1an.csv")
+                ecrire_meteo_csv(meteo_synthetique(1), path_meteo)
+            proc, url = demarrer_service(os.path.abspath(path_meteo), args.lot_max, args.attente_ms)
+        clients = clients_synthetiques(args.requetes, graine=args.graine)
+        r = asyncio.run(charger(url, clients, args.mode, args.connexions, args.taille_lot))
+        afficher(r)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(dict(r, url=url), f, indent=1, ensure_ascii=False)
+        return 1 if r["erreurs"] else 0
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        if dossier is not None:
+            shutil.rmtree(dossier, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
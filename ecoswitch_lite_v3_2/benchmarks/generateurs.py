@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# Données synthétiques à l'échelle réelle : années météo horaires (8760 h ou
+# pluriannuelles), calendrier Tempo, portefeuilles de clients. Reproductibles (graine).
+import json
+import numpy as np
+import pandas as pd
+
+CODES_POSTAUX = ("69000", "69100", "38000", "42000", "01000", "73000")
+MODES_TARIF = ("base", "hp_hc", "tempo")
+
+def meteo_synthetique(annees: int = 1, debut: str = "2023-01-01", graine: int = 0) -> pd.DataFrame:
+    """Température horaire : saison + cycle jour/nuit + bruit autocorrélé (AR(1))."""
+    rng = np.random.default_rng(graine)
+    n = 8760 * annees
+    h = np.arange(n)
+    jour = h / 24.0
+    saison = 11.0 - 9.0 * np.cos(2 * np.pi * (jour - 15) / 365.25)
+    diurne = 4.0 * np.sin(2 * np.pi * ((h % 24) - 9) / 24)
+    bruit = np.empty(n)
+    bruit[0] = 0.0
+    eps = rng.normal(0.0, 0.6, n)
+    for i in range(1, n):  # une fois par jeu de données
+        bruit[i] = 0.97 * bruit[i - 1] + eps[i]
+    dates = pd.date_range(debut, periods=n, freq="h", name="datetime")
+    return pd.DataFrame({"t_ext": np.round(saison + diurne + bruit, 2)}, index=dates)
+
+def calendrier_tempo_synthetique(meteo: pd.DataFrame) -> dict:
+    """22 jours rouges et 43 blancs par hiver, sur les jours les plus froids (hors dimanches)."""
+    jours = meteo["t_ext"].resample("D").mean()
+    calendrier = {}
+    for annee, t in jours.groupby(jours.index.year):
+        t = t[t.index.dayofweek != 6].sort_values()
+        for d in t.index[:22]:
+            calendrier[d.strftime("%Y-%m-%d")] = "rouge"
+        for d in t.index[22:65]:
+            calendrier[d.strftime("%Y-%m-%d")] = "blanc"
+    return calendrier
+
+def clients_synthetiques(n: int, graine: int = 0, calendrier_tempo=None) -> list:
+    rng = np.random.default_rng(graine)
+    modes = rng.choice(MODES_TARIF, n)
+    clients = []
+    for i in range(n):
+        c = {
+            "id": "S{:06d}".format(i),
+            "nom": "Client synthétique {}".format(i),
+            "code_postal": CODES_POSTAUX[i % len(CODES_POSTAUX)],
+            "ua_w_k": round(float(rng.uniform(80, 450)), 1),
+            "t_confort": float(rng.choice([18.0, 19.0, 19.5, 20.0, 21.0])),
+            "rendement_chaudiere": round(float(rng.uniform(0.80, 0.97)), 2),
+            "mode_tarif": str(modes[i]),
+            "prix_elec_eur_kwh": round(float(rng.uniform(0.18, 0.28)), 3),
+            "prix_gaz_eur_kwh": round(float(rng.uniform(0.08, 0.14)), 3),
+            "t_depart_pac": int(rng.choice([35, 45, 50, 55])),
+        }
+        if c["mode_tarif"] == "tempo" and calendrier_tempo is not None:
+            c["calendrier_tempo"] = calendrier_tempo
+        clients.append(c)
+    return clients
+
+def ecrire_meteo_csv(meteo: pd.DataFrame, path: str):
+    meteo.to_csv(path, index=True, date_format="%Y-%m-%d %H:%M:%S")
+
+def ecrire_clients_jsonl(clients: list, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(c, ensure_ascii=False) + "\n" for c in clients)
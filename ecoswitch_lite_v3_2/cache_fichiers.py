@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Cache mémoire des fichiers de données (tarifs, calendriers, grilles COP)
+# Un fichier n'est relu que si son mtime/taille change sur disque.
+import os
+
+_CACHE = {}
+
+def charger_fichier(path: str, parseur):
+    """
+    Retourne parseur(path), mis en cache tant que le fichier n'a pas changé.
+    La clé inclut le parseur : un même fichier peut être compilé de plusieurs façons.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    signature = (st.st_mtime_ns, st.st_size)
+    cle = (path, parseur)
+    entree = _CACHE.get(cle)
+    if entree is not None and entree[0] == signature:
+        return entree[1]
+    valeur = parseur(path)
+    _CACHE[cle] = (signature, valeur)
+    return valeur
+
+def vider_cache():
+    _CACHE.clear()
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+# Cache disque des résultats (SQLite), adressé par contenu : la clé d'un client est
+# l'empreinte de son dict, des fichiers qu'il référence (tarif HP/HC ou Tempo,
+# calendrier Tempo, grille COP), de la météo simulée et de VERSION_MODELE.
+# Un client inchangé d'une exécution à l'autre est servi sans recalcul ; toute
+# modification d'une entrée change la clé (pas d'invalidation à gérer).
+# Éviction LRU quand la taille totale dépasse taille_max_mo.
+#
+#   with CacheResultats("cache.sqlite") as cache:
+#       lignes = simuler_flotte(clients, meteo, cache=cache)
+#
+# Résultats de flotte stockés en vecteurs float64 (une valeur par colonne calculée) :
+# relecture par np.frombuffer, sans décodage JSON ligne à ligne.
+import io
+import json
+import time
+import hashlib
+import sqlite3
+
+import numpy as np
+
+from cache_fichiers import charger_fichier
+from meteo_data import tableaux_meteo
+
+# À incrémenter à chaque changement de formule ou de règle (invalide tout le cache)
+VERSION_MODELE = "3.2.18"
+TAILLE_MAX_MO = 512.0
+LOT_SQL = 500   # clés par requête IN (...)
+
+def _empreinte_contenu(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+def empreinte_fichier(path: str) -> str:
+    """Empreinte du contenu d'un fichier (relu seulement si mtime/taille changent)."""
+    return charger_fichier(path, _empreinte_contenu)
+
+def empreinte_meteo(meteo) -> str:
+    """Empreinte de la tranche météo (dates et températures)."""
+    dates, t_ext = tableaux_meteo(meteo)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(np.asarray(dates, dtype="datetime64[s]")).view(np.int64).tobytes())
+    h.update(np.ascontiguousarray(t_ext, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+def _empreinte_fichiers(mode: str, calendrier, modele_pac) -> str:
+    """Empreinte des fichiers dont dépend un client, en plus de son dict."""
+    from tarifs import TARIFS_HP_HC, TARIFS_TEMPO
+    from modele_cop import chemin_grille_cop
+
+    fichiers = []
+    if mode in ("hp_hc", "tempo"):
+        fichiers.append(TARIFS_HP_HC if mode == "hp_hc" else TARIFS_TEMPO)
+    if calendrier:
+        fichiers.append(calendrier)
+    if modele_pac:
+        fichiers.append(chemin_grille_cop(modele_pac))
+    return "|".join(empreinte_fichier(f) for f in fichiers)
+
+def cles_clients(clients: list, contexte: str) -> list:
+    """
+    Clé de cache de chaque client ; contexte : empreinte météo + variante de calcul.
+    Le dict est sérialisé par repr de ses items triés (valeurs exactes, types distingués).
+    """
+    prefixe = (VERSION_MODELE + "\0" + contexte + "\0").encode("utf-8")
+    fichiers = {}  # (mode, calendrier, modèle PAC) -> empreinte, une fois par appel
+    cles = []
+    for c in clients:
+        cal = c.get("calendrier_tempo")
+        sig = (c.get("mode_tarif", "base"), cal if isinstance(cal, str) else None, c.get("modele_pac"))
+        if sig not in fichiers:
+            fichiers[sig] = _empreinte_fichiers(*sig)
+        texte = repr(sorted(c.items())) + "\0" + fichiers[sig]
+        cles.append(hashlib.blake2b(prefixe + texte.encode("utf-8"), digest_size=16).hexdigest())
+    return cles
+
+class CacheResultats:
+    """
+    Magasin SQLite clé -> octets, borné en taille (éviction des entrées les moins
+    récemment utilisées). differe=True (workers d'un pool) : lectures seules, les
+    nouvelles entrées et les accès sont mis de côté (extraire_differe) pour être
+    appliqués par le processus parent, seul écrivain.
+    """
+
+    def __init__(self, path: str, taille_max_mo: float = TAILLE_MAX_MO, differe: bool = False):
+        self.path = path
+        self.taille_max = int(taille_max_mo * 1e6)
+        self.differe = differe
+        self.succes = self.echecs = 0
+        self._entrees, self._touches = {}, []
+        self.db = sqlite3.connect(path, timeout=30.0)
+        self.db.execute("PRAGMA journal_mode=WAL")   # lectures des workers pendant les écritures
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS resultats (cle TEXT PRIMARY KEY, valeur BLOB NOT NULL, "
+                            "taille INTEGER NOT NULL, acces REAL NOT NULL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS resultats_acces ON resultats (acces)")
+        self.taille = self.db.execute("SELECT COALESCE(SUM(taille), 0) FROM resultats").fetchone()[0]
+
+    def chercher(self, cles: list) -> dict:
+        """{clé: octets} des clés présentes (marquées comme récemment utilisées)."""
+        trouves = {}
+        uniques = list(dict.fromkeys(cles))
+        for i in range(0, len(uniques), LOT_SQL):
+            lot = uniques[i:i + LOT_SQL]
+            requete = "SELECT cle, valeur FROM resultats WHERE cle IN ({})".format(",".join("?" * len(lot)))
+            trouves.update(self.db.execute(requete, lot).fetchall())
+        self.succes += len(trouves)
+        self.echecs += len(uniques) - len(trouves)
+        self._toucher(list(trouves))
+        return trouves
+
+    def enregistrer(self, entrees: dict):
+        """Ajoute {clé: octets} (remplace les clés existantes), puis évince si besoin."""
+        if self.differe:
+            self._entrees.update(entrees)
+            return
+        maintenant = time.time()
+        with self.db:
+            for cle, valeur in entrees.items():
+                ancienne = self.db.execute("SELECT taille FROM resultats WHERE cle = ?", (cle,)).fetchone()
+                self.db.execute("INSERT OR REPLACE INTO resultats VALUES (?, ?, ?, ?)",
+                                (cle, valeur, len(valeur), maintenant))
+                self.taille += len(valeur) - (ancienne[0] if ancienne else 0)
+        self.evincer()
+
+    def _toucher(self, cles: list):
+        if not cles:
+            return
+        if self.differe:
+            self._touches += cles
+            return
+        maintenant = time.time()
+        with self.db:
+            for i in range(0, len(cles), LOT_SQL):
+                lot = cles[i:i + LOT_SQL]
+                self.db.execute("UPDATE resultats SET acces = ? WHERE cle IN ({})".format(",".join("?" * len(lot))),
+                                [maintenant] + lot)
+
+    def extraire_differe(self) -> dict:
+        """Entrées, accès et compteurs mis de côté depuis le dernier appel (mode differe)."""
+        d = {"entrees": self._entrees, "touches": self._touches, "succes": self.succes, "echecs": self.echecs}
+        self._entrees, self._touches = {}, []
+        self.succes = self.echecs = 0
+        return d
+
+    def appliquer(self, differe: dict):
+        """Applique dans ce cache le résultat d'extraire_differe d'un worker."""
+        self._toucher(differe["touches"])
+        self.enregistrer(differe["entrees"])
+        self.succes += differe["succes"]
+        self.echecs += differe["echecs"]
+
+    def evincer(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de la taille maximale."""
+        if self.taille <= self.taille_max:
+            return
+        a_liberer = self.taille - int(0.9 * self.taille_max)  # marge : pas d'éviction à chaque ajout
+        victimes, libere = [], 0
+        for cle, taille in self.db.execute("SELECT cle, taille FROM resultats ORDER BY acces"):
+            victimes.append((cle,))
+            libere += taille
+            if libere >= a_liberer:
+                break
+        with self.db:
+            self.db.executemany("DELETE FROM resultats WHERE cle = ?", victimes)
+        self.taille -= libere
+
+    def statistiques(self) -> dict:
+        n = self.db.execute("SELECT COUNT(*) FROM resultats").fetchone()[0]
+        return {"entrees": n, "octets": self.taille, "succes": self.succes, "echecs": self.echecs}
+
+    def fermer(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    # --- Résultats mémoïsés -------------------------------------------------------------
+
+    def colonnes(self, clients: list, contexte: str, noms: tuple, calcul) -> dict:
+        """
+        Colonnes numériques {nom: tableau (n_clients,)} : depuis le cache, calcul(clients
+        manquants) -> colonnes pour les autres, alors enregistrées. Colonne absente du
+        calcul : NaN.
+        """
+        cles = cles_clients(clients, contexte + "\0" + ",".join(noms))
+        trouves = self.chercher(cles)
+        valeurs = np.full((len(clients), len(noms)), np.nan)
+        presents = [i for i, k in enumerate(cles) if k in trouves]
+        if presents:
+            valeurs[presents] = np.frombuffer(b"".join(trouves[cles[i]] for i in presents),
+                                              dtype=np.float64).reshape(len(presents), len(noms))
+        manquants = [i for i, k in enumerate(cles) if k not in trouves]
+        if manquants:
+            calculees = calcul([clients[i] for i in manquants])
+            for j, nom in enumerate(noms):
+                if nom in calculees:
+                    valeurs[manquants, j] = calculees[nom]
+            self.enregistrer({cles[i]: valeurs[i].tobytes() for i in manquants})
+        return {nom: valeurs[:, j] for j, nom in enumerate(noms)}
+
+def resultat_client(client: dict, meteo, cache: CacheResultats, horaires: bool = False) -> dict:
+    """
+    Agrégats, verdict et EcoScore d'un client (simuler_tableaux), via le cache ;
+    horaires=True ajoute les séries horaires (tableaux NumPy, stockées à part).
+    """
+    from simulateur import simuler_tableaux
+    from verdict_engine import recommander_solution
+    from eco_score import calculer_ecoscore
+
+    cle = cles_clients([client], "client/" + empreinte_meteo(meteo))[0]
+    cle_h = cle + "/horaires"
+    trouves = cache.chercher([cle, cle_h] if horaires else [cle])
+    if cle in trouves and (not horaires or cle_h in trouves):
+        res = json.loads(trouves[cle])
+        if horaires:
+            with np.load(io.BytesIO(trouves[cle_h]), allow_pickle=False) as npz:
+                res["horaires"] = {k: npz[k] for k in npz.files}
+        return res
+    sim = simuler_tableaux(client, meteo)
+    res = {"aggregats": sim["aggregats"], "verdict": recommander_solution(sim, client),
+           "ecoscore": calculer_ecoscore(sim)}
+    entrees = {cle: json.dumps(res, ensure_ascii=False).encode("utf-8")}
+    if horaires:
+        buf = io.BytesIO()
+        np.savez(buf, **sim["horaires"])
+        entrees[cle_h] = buf.getvalue()
+        res["horaires"] = sim["horaires"]
+    cache.enregistrer(entrees)
+    return res
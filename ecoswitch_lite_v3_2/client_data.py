@@ -1,6 +1,42 @@
 # -*- coding: utf-8 -*-
+import csv
 import json
 
+# Champs numériques d'un client (les autres restent des chaînes, ex. code_postal)
+CHAMPS_NUMERIQUES = ("ua_w_k", "t_confort", "rendement_chaudiere", "t_depart_pac",
+                     "prix_elec_eur_kwh", "prix_gaz_eur_kwh",
+                     "capacite_thermique_kwh_k", "bande_confort_bas", "bande_confort_haut",
+                     "pas_pilotage_c", "puissance_max_kw")
+
 def load_client(path_json: str):
     with open(path_json, "r", encoding="utf-8") as f:
         return json.load(f)
+
+def _client_csv(row: dict) -> dict:
+    client = {k: v for k, v in row.items() if k and v not in (None, "")}
+    for k in CHAMPS_NUMERIQUES:
+        if k in client:
+            client[k] = float(client[k])
+    return client
+
+def iter_clients(path: str):
+    """
+    Parcourt un portefeuille client par client, sans tout charger en mémoire.
+    Formats : JSONL (un client par ligne), CSV (une colonne par champ) ou JSON (liste).
+    """
+    low = path.lower()
+    if low.endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                yield _client_csv(row)
+    elif low.endswith(".jsonl") or low.endswith(".ndjson"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        data = load_client(path)
+        yield from (data if isinstance(data, list) else [data])
+
+def load_clients(path: str) -> list:
+    return list(iter_clients(path))
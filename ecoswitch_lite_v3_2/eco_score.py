@@ -1,15 +1,21 @@
 # -*- coding: utf-8 -*-
-def calculer_ecoscore(resultats: dict) -> int:
-    a = resultats["aggregats"]
-    cout_gaz = a["cout_gaz_eur"]
-    cout_hybride = a["cout_hybride_eur"]
-    co2_gaz = a["co2_gaz_kg"]
-    co2_hybride = a["co2_hybride_kg"]
+import numpy as np
+
+def _gain(ref, val):
+    ref = np.asarray(ref, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        g = np.maximum(0.0, (ref - val) / ref)
+    return np.where(ref > 0, g, 0.0)
 
+def ecoscores(cout_gaz, cout_hybride, co2_gaz, co2_hybride):
+    """EcoScore vectorisé (tableau d'entiers 0–100)."""
     # Gains relatifs (vs gaz seul)
-    gain_euro = max(0.0, (cout_gaz - cout_hybride) / cout_gaz) if cout_gaz > 0 else 0.0
-    gain_co2 = max(0.0, (co2_gaz - co2_hybride) / co2_gaz) if co2_gaz > 0 else 0.0
+    gain_euro = _gain(cout_gaz, cout_hybride)
+    gain_co2 = _gain(co2_gaz, co2_hybride)
 
     score = 100.0 * (0.6 * gain_euro + 0.4 * gain_co2)
-    score = int(round(max(0.0, min(100.0, score))))
-    return score
+    return np.round(np.clip(score, 0.0, 100.0)).astype(int)
+
+def calculer_ecoscore(resultats: dict) -> int:
+    a = resultats["aggregats"]
+    return int(ecoscores(a["cout_gaz_eur"], a["cout_hybride_eur"], a["co2_gaz_kg"], a["co2_hybride_kg"]))
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+# Simulation de portefeuille : tous les clients × toutes les heures en tableaux 2-D
+# sur une météo partagée. Mêmes formules que simulate_chauffage (noyau_calcul),
+# sans construire de DataFrame par client.
+import json
+import math
+import numpy as np
+
+from client_data import iter_clients
+from meteo_data import tableaux_meteo
+from noyau_calcul import (CLES_AGREGATS, energie_utile_directe, sommes_scenarios, cop_median_exact,
+                          agregats_depuis_sommes)
+from modele_cop import cop_horaire
+from tarifs import prix_elec_horaire
+from verdict_engine import VERDICTS, codes_verdict
+from pilotage import CLES_PILOTE, parametres_pilotage, scenario_pilote
+from eco_score import ecoscores
+
+# Clients par bloc 2-D : borne la mémoire à ~ bloc × heures × quelques tableaux
+TAILLE_BLOC = 64
+
+# Champs recopiés tels quels dans chaque ligne de résultat
+CHAMPS_IDENTITE = ("id", "nom", "code_postal")
+# Colonnes numériques de simuler_flotte_colonnes (disposition des vecteurs du cache)
+COLONNES_CALCULEES = CLES_AGREGATS + CLES_PILOTE + ("code_verdict", "ecoscore")
+
+def _cle(v):
+    return json.dumps(v, sort_keys=True) if isinstance(v, (dict, list)) else v
+
+def colonnes_resultat(clients) -> list:
+    """
+    En-tête CSV des lignes de résultats (écriture séquentielle ou parallèle) : champs
+    d'identité présents, agrégats, colonnes du pilotage si au moins un client est piloté.
+    """
+    identite, pilote = set(), False
+    for c in clients:
+        identite.update(k for k in CHAMPS_IDENTITE if k in c)
+        pilote = pilote or parametres_pilotage(c) is not None
+    return ([k for k in CHAMPS_IDENTITE if k in identite] + list(CLES_AGREGATS)
+            + (list(CLES_PILOTE) if pilote else []) + ["verdict", "ecoscore"])
+
+def lister_clients(source) -> list:
+    """Chemin (JSONL/CSV/JSON), DataFrame (une ligne par client) ou itérable de dicts."""
+    if isinstance(source, str):
+        return list(iter_clients(source))
+    if hasattr(source, "to_dict"):
+        import pandas as pd
+
+        # Cellules vides (NaN, None, "") = champ absent, comme pour un CSV (_client_csv)
+        return [{k: v for k, v in r.items() if not (pd.api.types.is_scalar(v) and (pd.isna(v) or v == ""))}
+                for r in source.to_dict("records")]
+    return list(source)
+
+def _profils(clients, dates, t_ext):
+    """
+    Lignes horaires partagées entre clients : une ligne COP par (modèle PAC, T_depart),
+    une ligne de prix élec par tarif. Le mode base utilise une ligne de 1 mise à l'échelle
+    par le prix du client, pour ne pas créer une ligne par prix distinct.
+    """
+    cop_lignes, cop_cles, idx_cop = [], {}, []
+    prix_lignes, prix_cles, idx_prix, echelle = [], {}, [], []
+    for c in clients:
+        t_depart = float(c.get("t_depart_pac", 50))
+        k = (c.get("modele_pac") or None, t_depart)
+        if k not in cop_cles:
+            cop_cles[k] = len(cop_lignes)
+            cop_lignes.append(cop_horaire(c, t_ext, t_depart))
+        idx_cop.append(cop_cles[k])
+
+        mode = c.get("mode_tarif", "base")
+        if mode in ("hp_hc", "tempo"):
+            k = (mode, _cle(c.get("calendrier_tempo")) if mode == "tempo" else None)
+            echelle.append(1.0)
+        else:
+            k = ("base", None)
+            echelle.append(float(c["prix_elec_eur_kwh"]))
+        if k not in prix_cles:
+            prix_cles[k] = len(prix_lignes)
+            prix_lignes.append(prix_elec_horaire(c, dates) if k[0] != "base" else np.ones(len(dates)))
+        idx_prix.append(prix_cles[k])
+    return (np.array(cop_lignes), np.array(idx_cop), np.array(prix_lignes), np.array(idx_prix),
+            np.array(echelle, dtype=float))
+
+def simuler_flotte_colonnes(clients, meteo, taille_bloc: int = TAILLE_BLOC, dtype=np.float64) -> dict:
+    """
+    Agrégats de tous les clients en colonnes (un tableau de longueur n_clients par clé
+    d'aggregats), plus "code_verdict" (indice dans VERDICTS) et "ecoscore".
+    Sommes directes par bloc (mode agrégats seuls du noyau), float32 possible via dtype.
+    """
+    clients = lister_clients(clients)
+    n = len(clients)
+    dates, t_ext = tableaux_meteo(meteo)
+    t_ext = np.asarray(t_ext, dtype=float)
+
+    ua = np.array([float(c["ua_w_k"]) for c in clients])
+    t_confort = np.array([float(c["t_confort"]) for c in clients])
+    eta_gaz = np.array([float(c["rendement_chaudiere"]) for c in clients])
+    prix_gaz = np.array([float(c["prix_gaz_eur_kwh"]) for c in clients])
+    cops, idx_cop, prix_lignes, idx_prix, echelle = _profils(clients, dates, t_ext) if n else (None,) * 5
+    if n:
+        cops, prix_lignes, echelle = (a.astype(dtype, copy=False) for a in (cops, prix_lignes, echelle))
+
+    out = {}
+    for s in range(0, n, taille_bloc):
+        b = slice(s, min(s + taille_bloc, n))
+        e_utile = energie_utile_directe(ua[b, None], t_confort[b, None], t_ext, dtype)
+        cop = cops[idx_cop[b]]
+        prix_elec = prix_lignes[idx_prix[b]] * echelle[b, None]
+        sommes = sommes_scenarios(e_utile, cop, prix_elec, prix_gaz[b, None], eta_gaz[b, None])
+        agregats = agregats_depuis_sommes(sommes, cop_median_exact(e_utile, cop), prix_gaz[b], eta_gaz[b])
+        for k, v in agregats.items():
+            out.setdefault(k, np.empty(n))[b] = v
+
+    if not n:
+        return {"code_verdict": np.empty(0, dtype=np.int8), "ecoscore": np.empty(0, dtype=int)}
+
+    # Hybride piloté : planning propre à chaque client concerné (NaN pour les autres)
+    pilotes = [i for i, c in enumerate(clients) if parametres_pilotage(c) is not None]
+    if pilotes:
+        for k in CLES_PILOTE:
+            out[k] = np.full(n, np.nan)
+        for i in pilotes:
+            prix_elec = prix_lignes[idx_prix[i]].astype(float) * float(echelle[i])
+            p = scenario_pilote(clients[i], t_ext, cops[idx_cop[i]].astype(float), prix_elec)
+            for k, v in p["aggregats"].items():
+                out[k][i] = v
+    out["code_verdict"] = codes_verdict(out["cout_pac_eur"], out["cout_gaz_eur"],
+                                        out["cout_hybride_eur"], out["cop_median"], out.get("cout_pilote_eur"))
+    out["ecoscore"] = ecoscores(out["cout_gaz_eur"], out["cout_hybride_eur"],
+                                out["co2_gaz_kg"], out["co2_hybride_kg"])
+    return out
+
+def lignes_resultats(clients: list, colonnes: dict) -> list:
+    """Une ligne (dict) par client : identité, agrégats, verdict, EcoScore."""
+    # Listes de floats Python une fois par colonne (pas d'accès scalaire NumPy par cellule)
+    valeurs = {k: np.asarray(v, dtype=float).tolist() for k, v in colonnes.items()
+               if k not in ("code_verdict", "ecoscore")}
+    codes = np.asarray(colonnes["code_verdict"]).astype(int).tolist()
+    scores = np.asarray(colonnes["ecoscore"]).astype(int).tolist()
+    lignes = []
+    for i, c in enumerate(clients):
+        ligne = {k: c[k] for k in CHAMPS_IDENTITE if k in c}
+        ligne.update({k: v[i] for k, v in valeurs.items()
+                      if k not in CLES_PILOTE or math.isfinite(v[i])})
+        ligne["verdict"] = VERDICTS[codes[i]]
+        ligne["ecoscore"] = scores[i]
+        lignes.append(ligne)
+    return lignes
+
+def simuler_flotte(clients, meteo, taille_bloc: int = TAILLE_BLOC, dtype=np.float64, cache=None) -> list:
+    """
+    Simule un portefeuille complet sur une météo partagée.
+    Retourne une ligne par client avec les clés d'aggregats + verdict + ecoscore
+    (identiques à simulate_chauffage / recommander_solution / calculer_ecoscore).
+    cache : CacheResultats (cache_resultats) ; seuls les clients absents sont simulés.
+    """
+    clients = lister_clients(clients)
+    if cache is not None:
+        from cache_resultats import empreinte_meteo
+
+        contexte = "flotte/{}/{}".format(np.dtype(dtype).name, empreinte_meteo(meteo))
+        colonnes = cache.colonnes(clients, contexte, COLONNES_CALCULEES,
+                                  lambda lot: simuler_flotte_colonnes(lot, meteo, taille_bloc, dtype))
+        return lignes_resultats(clients, colonnes)
+    return lignes_resultats(clients, simuler_flotte_colonnes(clients, meteo, taille_bloc, dtype))
+
+def simuler_flotte_locale(clients, source_meteo: str, index: dict = None, k: int = 1,
+                          taille_bloc: int = TAILLE_BLOC, cache=None) -> list:
+    """
+    Chaque client sur la météo de sa station (code postal -> station la plus proche,
+    ou mélange des k plus proches). source_meteo : stockage binaire ou dossier de CSV
+    <station>.csv. Les clients sont regroupés par météo ; lignes dans l'ordre d'entrée.
+    """
+    from stations_meteo import K_VOISINS, charger_index, stations_client, meteo_client
+
+    clients = lister_clients(clients)
+    index = index or charger_index(k=max(K_VOISINS, k))
+    groupes = {}
+    for i, c in enumerate(clients):
+        # Même météo = mêmes stations et mêmes poids (arrondis comme meteo_client),
+        # quelle que soit la distance propre à chaque code postal
+        choix = stations_client(c, index, k)
+        cle = (tuple(s for s, _, _ in choix), tuple(round(w, 6) for _, _, w in choix))
+        groupes.setdefault(cle, []).append(i)
+    lignes = [None] * len(clients)
+    for idx in groupes.values():
+        lot = [clients[i] for i in idx]
+        meteo = meteo_client(lot[0], source_meteo, index, k)
+        for i, ligne in zip(idx, simuler_flotte(lot, meteo, taille_bloc, cache=cache)):
+            lignes[i] = ligne
+    return lignes
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# Exécution parallèle d'un portefeuille (pool de processus) :
+# lecture des clients par lots, calcul dans les workers, écriture au fil de l'eau.
+# La mémoire reste bornée par (lots en vol × taille de lot), quel que soit le nombre de clients.
+import os
+import csv
+import json
+import time
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from client_data import iter_clients
+from meteo_data import lire_meteo
+from tarifs import charger_hp_hc, charger_tempo
+from flotte import colonnes_resultat, simuler_flotte, simuler_flotte_locale
+
+TAILLE_LOT = 1000
+
+# État d'un worker, chargé une fois par processus (initialiseur du pool)
+_METEO = None
+_LOCALE = None
+_CACHE = None
+
+def _init_worker(path_meteo: str, station: str = None, locale: dict = None, path_cache: str = None):
+    global _METEO, _LOCALE, _CACHE
+    if locale is not None:
+        # Météo par client : index des stations construit une fois par worker,
+        # séries chargées à la demande (cache LRU de stations_meteo)
+        from stations_meteo import charger_index, K_VOISINS
+
+        _LOCALE = dict(locale, source=path_meteo,
+                       index=charger_index(locale["stations"], locale["codes_postaux"], max(K_VOISINS, locale["k"])))
+    else:
+        # Stockage binaire : vues memory-mappées, pages partagées entre workers.
+        # Tableaux NumPy : pas d'import de pandas au démarrage des workers
+        _METEO = lire_meteo(path_meteo, station)
+    if path_cache is not None:
+        # Lectures seules : les nouveaux résultats sont écrits par le processus parent
+        from cache_resultats import CacheResultats
+
+        _CACHE = CacheResultats(path_cache, differe=True)
+    # Tarifs compilés et mis en cache dès le démarrage du worker
+    charger_hp_hc()
+    charger_tempo()
+
+def meteo_du_client(client: dict):
+    """Météo du worker pour ce client : partagée, ou celle de sa station (mode locale)."""
+    if _LOCALE is not None:
+        from stations_meteo import meteo_client
+
+        return meteo_client(client, _LOCALE["source"], _LOCALE["index"], _LOCALE["k"])
+    return _METEO
+
+def _traiter_lot(clients: list) -> tuple:
+    """
+    simulate_chauffage -> recommander_solution -> calculer_ecoscore pour un lot,
+    via la version vectorisée (flotte) : mêmes résultats, un seul passage 2-D.
+    Retourne (lignes, écritures de cache à appliquer par le parent ou None).
+    """
+    if _LOCALE is not None:
+        lignes = simuler_flotte_locale(clients, _LOCALE["source"], _LOCALE["index"], _LOCALE["k"], cache=_CACHE)
+    else:
+        lignes = simuler_flotte(clients, _METEO, cache=_CACHE)
+    return lignes, (_CACHE.extraire_differe() if _CACHE is not None else None)
+
+def iter_lots(path_clients: str, taille_lot: int = TAILLE_LOT):
+    clients = iter_clients(path_clients)
+    while True:
+        lot = list(itertools.islice(clients, taille_lot))
+        if not lot:
+            return
+        yield lot
+
+class _Ecrivain:
+    """Écriture incrémentale des lignes de résultats (CSV, ou JSONL si .jsonl)."""
+
+    def __init__(self, path: str, path_clients: str):
+        self.f = open(path, "w", encoding="utf-8", newline="")
+        self.jsonl = path.lower().endswith((".jsonl", ".ndjson"))
+        if not self.jsonl:
+            # En-tête fixé avant le premier lot : une passe de lecture des clients
+            self.w = csv.DictWriter(self.f, fieldnames=colonnes_resultat(iter_clients(path_clients)))
+            self.w.writeheader()
+
+    def ecrire(self, lignes: list):
+        if self.jsonl:
+            self.f.writelines(json.dumps(l, ensure_ascii=False) + "\n" for l in lignes)
+        else:
+            self.w.writerows(lignes)
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+def executer_flotte(path_clients: str, path_meteo: str, path_sortie: str,
+                    processus: int = None, taille_lot: int = TAILLE_LOT, progression=None,
+                    station: str = None, locale: dict = None, cache: str = None,
+                    cache_max_mo: float = None) -> dict:
+    """
+    Simule un portefeuille JSONL/CSV en parallèle et écrit les résultats dans l'ordre d'entrée.
+    - processus : nombre de workers (défaut : nombre de cœurs)
+    - progression : callback optionnel (clients_traites, clients_par_s) après chaque lot
+    - station : station à lire si path_meteo est un stockage binaire multi-stations
+    - locale : {"stations", "codes_postaux", "k"} pour simuler chaque client sur la météo
+      de sa station (path_meteo est alors un stockage ou un dossier de CSV par station)
+    - cache : base SQLite de résultats (cache_resultats) ; clients inchangés non recalculés
+    Retourne les statistiques d'exécution (clients, secondes, clients_par_s, cache).
+    """
+    processus = processus or os.cpu_count() or 1
+    en_vol_max = 2 * processus  # lots soumis mais non écrits : borne la mémoire
+    n, t0 = 0, time.perf_counter()
+    ecrivain = _Ecrivain(path_sortie, path_clients)
+    magasin, stats_cache = None, None
+    if cache is not None:
+        from cache_resultats import CacheResultats, TAILLE_MAX_MO
+
+        magasin = CacheResultats(cache, cache_max_mo or TAILLE_MAX_MO)  # crée la base avant les workers
+    try:
+        with ProcessPoolExecutor(max_workers=processus, initializer=_init_worker,
+                                 initargs=(path_meteo, station, locale, cache)) as pool:
+            en_vol = deque()
+            for lot in iter_lots(path_clients, taille_lot):
+                en_vol.append(pool.submit(_traiter_lot, lot))
+                while len(en_vol) >= en_vol_max:
+                    n += _vider(en_vol.popleft(), ecrivain, magasin, n, t0, progression)
+            while en_vol:
+                n += _vider(en_vol.popleft(), ecrivain, magasin, n, t0, progression)
+    finally:
+        ecrivain.close()
+        if magasin is not None:
+            stats_cache = magasin.statistiques()
+            magasin.fermer()
+    duree = time.perf_counter() - t0
+    return {"clients": n, "processus": processus, "secondes": duree,
+            "clients_par_s": n / duree if duree > 0 else 0.0, "cache": stats_cache}
+
+def _vider(future, ecrivain, magasin, n, t0, progression) -> int:
+    lignes, differe = future.result()
+    if differe is not None:
+        magasin.appliquer(differe)
+    ecrivain.ecrire(lignes)
+    if progression is not None:
+        total = n + len(lignes)
+        progression(total, total / max(time.perf_counter() - t0, 1e-9))
+    return len(lignes)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# Instrumentation légère : spans de temps imbriqués, compteurs d'allocations
+# (tracemalloc) et profil cProfile optionnel.
+#
+#   with span("simulation"):           # coût quasi nul hors session (contexte vide partagé)
+#       ...
+#   with session(memoire=True, cprofile=True) as mesures:
+#       main()
+#   mesures["spans"], mesures["resume"], mesures["cprofile"]
+#
+# L'état d'une session est propre au contexte d'exécution (ContextVar : thread d'une
+# session Streamlit, tâche asyncio) : des sessions simultanées ne partagent pas leurs
+# spans. tracemalloc reste global au processus : pics approximatifs si plusieurs
+# sessions mesurent la mémoire en même temps.
+import time
+import threading
+import contextlib
+import contextvars
+import tracemalloc
+
+_NUL = contextlib.nullcontext()
+# Session courante : {"memoire", "pile" (spans ouverts), "racines", "t0", "profileur", "tracemalloc"}
+_SESSION = contextvars.ContextVar("instrumentation", default=None)
+# Sessions mesurant la mémoire : tracemalloc démarré par la première, arrêté par la dernière
+_VERROU = threading.Lock()
+_MEMOIRE = {"sessions": 0, "demarre": False}
+
+def actif() -> bool:
+    """Session ouverte dans le contexte courant (pas celle d'un autre thread)."""
+    return _SESSION.get() is not None
+
+def span(nom: str):
+    """Mesure le bloc (durée, allocations nettes et pic) si une session est active."""
+    s = _SESSION.get()
+    if s is None:
+        return _NUL
+    return _span(s, nom)
+
+@contextlib.contextmanager
+def _span(s, nom):
+    pile = s["pile"]
+    noeud = {"nom": nom, "enfants": []}
+    parent = pile[-1] if pile else None
+    (parent["enfants"] if parent else s["racines"]).append(noeud)
+    pile.append(noeud)
+    if s["memoire"]:
+        courant0, pic_avant = tracemalloc.get_traced_memory()
+        if parent is not None:  # reset_peak efface le pic en cours du parent : on le reporte
+            parent["_pic"] = max(parent.get("_pic", 0), pic_avant)
+        tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    try:
+        yield noeud
+    finally:
+        noeud["duree_ms"] = 1e3 * (time.perf_counter() - t0)
+        if s["memoire"]:
+            courant, pic = tracemalloc.get_traced_memory()
+            pic = max(pic, noeud.pop("_pic", 0))
+            noeud["alloc_nette_ko"] = (courant - courant0) / 1e3
+            noeud["pic_ko"] = (pic - courant0) / 1e3
+            if parent is not None:
+                parent["_pic"] = max(parent.get("_pic", 0), pic)
+        pile.pop()
+
+def demarrer(memoire: bool = True, cprofile: bool = False) -> dict:
+    """
+    Ouvre une session de mesure dans le contexte courant (voir session ; utile quand un
+    bloc with ne convient pas). Retourne la session, à passer à arreter depuis un autre contexte.
+    """
+    if _SESSION.get() is not None:
+        raise RuntimeError("Une session d'instrumentation est déjà active")
+    s = {"memoire": memoire, "pile": [], "racines": [], "profileur": None, "tracemalloc": False}
+    if memoire:
+        with _VERROU:
+            if _MEMOIRE["sessions"] == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _MEMOIRE["demarre"] = True
+            _MEMOIRE["sessions"] += 1
+        s["tracemalloc"] = True
+    if cprofile:
+        import cProfile
+        s["profileur"] = cProfile.Profile()  # profil du thread courant
+        s["profileur"].enable()
+    s["t0"] = time.perf_counter()
+    _SESSION.set(s)
+    return s
+
+def arreter(top: int = 25, session: dict = None) -> dict:
+    """
+    Ferme la session courante (ou `session`, retournée par demarrer) ; retourne spans
+    (arbre), resume (par chemin) et cprofile (top fonctions).
+    """
+    s = session if session is not None else _SESSION.get()
+    if s is None:
+        raise RuntimeError("Aucune session d'instrumentation active")
+    if _SESSION.get() is s:
+        _SESSION.set(None)
+    duree = 1e3 * (time.perf_counter() - s["t0"])
+    profileur, s["profileur"] = s["profileur"], None
+    if profileur is not None:
+        profileur.disable()
+    if s["tracemalloc"]:
+        s["tracemalloc"] = False
+        with _VERROU:
+            _MEMOIRE["sessions"] -= 1
+            if _MEMOIRE["sessions"] == 0 and _MEMOIRE["demarre"]:
+                tracemalloc.stop()
+                _MEMOIRE["demarre"] = False
+    s["memoire"] = False
+    del s["pile"][:]
+    mesures = {"duree_totale_ms": duree, "spans": s["racines"], "resume": resume(s["racines"])}
+    if profileur is not None:
+        mesures["cprofile"] = _top_cprofile(profileur, top)
+    return mesures
+
+@contextlib.contextmanager
+def session(memoire: bool = True, cprofile: bool = False, top: int = 25):
+    mesures = {}
+    demarrer(memoire, cprofile)
+    try:
+        yield mesures
+    finally:
+        mesures.update(arreter(top))
+
+def resume(spans: list) -> dict:
+    """Totaux par chemin de span ("simulation/cop") : appels, durée cumulée, pic maximal."""
+    out = {}
+
+    def visiter(noeuds, prefixe):
+        for n in noeuds:
+            chemin = prefixe + n["nom"]
+            r = out.setdefault(chemin, {"appels": 0, "duree_ms": 0.0})
+            r["appels"] += 1
+            r["duree_ms"] += n.get("duree_ms", 0.0)
+            if "pic_ko" in n:
+                r["alloc_nette_ko"] = r.get("alloc_nette_ko", 0.0) + n["alloc_nette_ko"]
+                r["pic_ko"] = max(r.get("pic_ko", 0.0), n["pic_ko"])
+            visiter(n["enfants"], chemin + "/")
+
+    visiter(spans, "")
+    return out
+
+def _top_cprofile(profileur, top: int) -> list:
+    import pstats
+
+    stats = pstats.Stats(profileur).stats
+    lignes = []
+    for (fichier, ligne, fonction), (_, appels, tt, ct, _) in stats.items():
+        lignes.append({"fonction": "{}:{}({})".format(fichier, ligne, fonction), "appels": appels,
+                       "temps_propre_s": tt, "temps_cumule_s": ct})
+    lignes.sort(key=lambda l: l["temps_cumule_s"], reverse=True)
+    return lignes[:top]
@@ -1,27 +1,188 @@
 # -*- coding: utf-8 -*-
 # EcoSwitch Lite V3.2 — Base officielle
 # Entrée principale : lance une simulation avec données locales
+#   python main.py                                  -> client démo + rapport
+#   python main.py --flotte data/clients_demo.jsonl -> portefeuille complet (CSV)
+#   python main.py --flotte gros.jsonl --processus 8 -> idem, en parallèle et en flux
+#   python main.py --monte-carlo 10000 --graine 42  -> incertitudes du client démo
+#   python main.py --format-horaires parquet --colonnes COP,Cout_pac_eur -> export horaire au choix
+#   python main.py --flotte gros.jsonl --rapports rapports.zip -> rapport de chaque client (archive)
+#   python main.py --flotte gros.jsonl --cache cache.sqlite -> clients inchangés servis depuis le cache
+#   python main.py --profile profil.json            -> + temps/mémoire par étape (JSON)
+
+import os
+import argparse
+import csv
+import json
 
 from client_data import load_client
-from meteo_data import load_meteo
-from simulateur import simulate_chauffage
+from meteo_data import lire_meteo
+from simulateur import simuler_tableaux
 from verdict_engine import recommander_solution
 from eco_score import calculer_ecoscore
-from rapport_client import generer_rapport
+from rapport_client import FORMATS, generer_rapport
+from instrumentation import span, session
 
-def main():
-    client = load_client("demo_client.json")
-    meteo = load_meteo("data/meteo_demo.csv")
+def main(fmt: str = "csv", colonnes=None):
+    with span("chargement"):
+        client = load_client("demo_client.json")
+        meteo = lire_meteo("data/meteo_demo.csv")
 
-    resultats = simulate_chauffage(client, meteo)
-    verdict = recommander_solution(resultats, client)
-    score = calculer_ecoscore(resultats)
+    with span("simulation"):
+        resultats = simuler_tableaux(client, meteo)
+    with span("verdict"):
+        verdict = recommander_solution(resultats, client)
+    with span("ecoscore"):
+        score = calculer_ecoscore(resultats)
 
-    generer_rapport(client, resultats, verdict, score)
+    with span("rapport"):
+        generer_rapport(client, resultats, verdict, score, fmt, colonnes)
 
     print("✅ Simulation terminée")
     print("Verdict :", verdict)
     print("EcoScore global :", score)
 
+def ecrire_lignes_csv(lignes: list, path: str, champs: list):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=champs)
+        w.writeheader()
+        w.writerows(lignes)
+
+def afficher_cache(stats: dict):
+    if stats is not None:
+        print("Cache : {} clients servis depuis le cache, {} calculés ({} entrées, {:.1f} Mo)".format(
+            stats["succes"], stats["echecs"], stats["entrees"], stats["octets"] / 1e6))
+
+def main_flotte(path_clients: str, path_meteo: str, path_sortie: str, station: str = None, locale: dict = None,
+                cache: str = None, cache_max_mo: float = None):
+    from flotte import colonnes_resultat, lister_clients, simuler_flotte, simuler_flotte_locale
+
+    clients = lister_clients(path_clients)
+    magasin = None
+    if cache is not None:
+        from cache_resultats import CacheResultats, TAILLE_MAX_MO
+
+        magasin = CacheResultats(cache, cache_max_mo or TAILLE_MAX_MO)
+    try:
+        if locale is not None:
+            from stations_meteo import charger_index, K_VOISINS
+
+            index = charger_index(locale["stations"], locale["codes_postaux"], max(K_VOISINS, locale["k"]))
+            lignes = simuler_flotte_locale(clients, path_meteo, index, locale["k"], cache=magasin)
+        else:
+            lignes = simuler_flotte(clients, lire_meteo(path_meteo, station), cache=magasin)
+        stats = magasin.statistiques() if magasin is not None else None
+    finally:
+        if magasin is not None:
+            magasin.fermer()
+    ecrire_lignes_csv(lignes, path_sortie, colonnes_resultat(clients))
+
+    print("✅ Portefeuille simulé :", len(lignes), "clients ->", path_sortie)
+    afficher_cache(stats)
+
+def main_flotte_parallele(path_clients: str, path_meteo: str, path_sortie: str, processus: int, taille_lot: int,
+                          station: str = None, locale: dict = None, cache: str = None, cache_max_mo: float = None):
+    from flotte_parallele import executer_flotte
+
+    stats = executer_flotte(path_clients, path_meteo, path_sortie, processus=processus, taille_lot=taille_lot,
+                            station=station, locale=locale, cache=cache, cache_max_mo=cache_max_mo)
+
+    print("✅ Portefeuille simulé :", stats["clients"], "clients ->", path_sortie)
+    print("Débit : {:.0f} clients/s ({} processus, {:.2f} s)".format(
+        stats["clients_par_s"], stats["processus"], stats["secondes"]))
+    afficher_cache(stats["cache"])
+
+def main_rapports(path_clients: str, path_meteo: str, path_archive: str, processus: int, fmt: str, colonnes=None,
+                  station: str = None, locale: dict = None):
+    from rapport_client import exporter_rapports_flotte
+
+    stats = exporter_rapports_flotte(path_clients, path_meteo, path_archive, fmt, colonnes, processus,
+                                     station=station, locale=locale)
+
+    print("✅ Rapports :", stats["clients"], "clients ->", path_archive,
+          "({:.1f} Mo, {:.0f} clients/s)".format(stats["octets"] / 1e6, stats["clients_par_s"]))
+
+def main_monte_carlo(n_tirages: int, graine, path_meteo: str, station: str = None):
+    from monte_carlo import simuler_incertitudes
+
+    client = load_client("demo_client.json")
+    mc = simuler_incertitudes(client, lire_meteo(path_meteo, station), n_tirages=n_tirages, graine=graine)
+
+    print("✅ Ensemble Monte Carlo :", mc["n_tirages"], "tirages (graine {})".format(graine))
+    for cle in ("cout_gaz_eur", "cout_pac_eur", "cout_hybride_eur", "co2_gaz_kg", "co2_hybride_kg"):
+        p = mc["percentiles"][cle]
+        print("{:<17}: P5 {:.1f} | P50 {:.1f} | P95 {:.1f}".format(cle, p[5], p[50], p[95]))
+    for verdict, proba in mc["proba_verdicts"].items():
+        print("{:5.1f} % {}".format(100 * proba, verdict))
+    e = mc["ecoscore_distribution"]["percentiles"]
+    print("EcoScore : P5 {:.0f} | P50 {:.0f} | P95 {:.0f}".format(e[5], e[50], e[95]))
+
+def _args():
+    p = argparse.ArgumentParser(description="EcoSwitch Lite V3.2")
+    p.add_argument("--flotte", metavar="CLIENTS", help="portefeuille JSONL/CSV/JSON à simuler en un seul appel")
+    p.add_argument("--meteo", default="data/meteo_demo.csv", help="météo horaire partagée (CSV ou stockage binaire)")
+    p.add_argument("--station", help="station à lire dans un stockage météo binaire multi-stations")
+    p.add_argument("--sortie", default="resultats_flotte.csv", help="sortie du mode flotte (CSV, ou JSONL si .jsonl)")
+    p.add_argument("--processus", type=int, help="mode flotte parallèle : nombre de processus (0 = nombre de cœurs)")
+    p.add_argument("--monte-carlo", type=int, metavar="N", help="ensemble de N tirages incertains sur le client démo")
+    p.add_argument("--graine", type=int, help="graine du mode Monte Carlo (reproductible)")
+    p.add_argument("--taille-lot", type=int, default=1000, help="clients par lot en mode parallèle")
+    p.add_argument("--meteo-locale", action="store_true",
+                   help="mode flotte : météo de la station la plus proche du code postal "
+                        "(--meteo = stockage binaire ou dossier de CSV <station>.csv)")
+    p.add_argument("--stations", default="data/stations_demo.csv", help="stations météo (station,lat,lon)")
+    p.add_argument("--codes-postaux", default="data/codes_postaux_demo.csv",
+                   help="centroïdes des codes postaux (code_postal,lat,lon)")
+    p.add_argument("--voisins", type=int, default=1, help="stations mélangées par inverse de la distance")
+    p.add_argument("--format-horaires", choices=list(FORMATS), default=None,
+                   help="format des séries horaires (défaut : csv ; en mode --rapports : parquet si pyarrow, sinon csv.gz)")
+    p.add_argument("--colonnes", help="colonnes horaires exportées, séparées par des virgules (défaut : toutes)")
+    p.add_argument("--rapports", metavar="ARCHIVE",
+                   help="avec --flotte : rapport + séries horaires de chaque client dans une archive zip")
+    p.add_argument("--cache", metavar="SQLITE",
+                   help="mode flotte : cache disque des résultats (clients inchangés non recalculés)")
+    p.add_argument("--cache-max-mo", type=float, help="taille maximale du cache en Mo (éviction LRU, défaut 512)")
+    p.add_argument("--profile", nargs="?", const="profil.json", metavar="JSON",
+                   help="profil d'exécution (spans de temps, allocations) écrit en JSON (défaut : profil.json)")
+    p.add_argument("--cprofile", action="store_true", help="avec --profile : ajoute le top des fonctions cProfile")
+    args = p.parse_args()
+    if args.meteo_locale and not os.path.isdir(args.meteo):
+        p.error("--meteo-locale : --meteo doit être un stockage binaire ou un dossier de CSV <station>.csv "
+                "(reçu : {})".format(args.meteo))
+    if args.voisins < 1:
+        p.error("--voisins : au moins 1 station")
+    return args
+
+def executer(args):
+    locale = ({"stations": args.stations, "codes_postaux": args.codes_postaux, "k": args.voisins}
+              if args.meteo_locale else None)
+    colonnes = args.colonnes.split(",") if args.colonnes else None
+    if args.monte_carlo is not None:
+        main_monte_carlo(args.monte_carlo, args.graine, args.meteo, args.station)
+    elif args.flotte and args.rapports:
+        main_rapports(args.flotte, args.meteo, args.rapports, args.processus or None, args.format_horaires,
+                      colonnes, args.station, locale)
+    elif args.flotte and args.processus is not None:
+        main_flotte_parallele(args.flotte, args.meteo, args.sortie, args.processus or None, args.taille_lot,
+                              args.station, locale, args.cache, args.cache_max_mo)
+    elif args.flotte:
+        main_flotte(args.flotte, args.meteo, args.sortie, args.station, locale, args.cache, args.cache_max_mo)
+    else:
+        main(args.format_horaires or "csv", colonnes)
+
+def executer_profile(args):
+    with session(memoire=True, cprofile=args.cprofile) as mesures:
+        with span("total"):
+            executer(args)
+    with open(args.profile, "w", encoding="utf-8") as f:
+        json.dump(mesures, f, indent=1, ensure_ascii=False)
+    print("⏱️ Profil :", args.profile)
+    for chemin, r in mesures["resume"].items():
+        print("  {:<32} {:>9.2f} ms  pic {:>9.1f} ko".format(chemin, r["duree_ms"], r.get("pic_ko", 0.0)))
+
 if __name__ == "__main__":
-    main()
+    args = _args()
+    if args.profile:
+        executer_profile(args)
+    else:
+        executer(args)
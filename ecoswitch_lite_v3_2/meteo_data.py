@@ -1,11 +1,61 @@
 # -*- coding: utf-8 -*-
-import pandas as pd
+# Deux formes de météo acceptées par les calculs :
+# - tableaux NumPy {"datetime": datetime64[s], "t_ext": float} (lire_meteo) : sans pandas,
+#   démarrage rapide de la CLI et des processus workers ;
+# - DataFrame indexé par datetime (load_meteo) : interface Streamlit, exports.
+# pandas n'est importé que par load_meteo (et le repli de lecture des dates non ISO).
+import csv
 
-def load_meteo(path_csv: str) -> pd.DataFrame:
+import numpy as np
+
+def lire_meteo(path_csv: str, station: str = None, debut=None, fin=None) -> dict:
+    """
+    Météo en tableaux NumPy : {"datetime": datetime64[s] trié, "t_ext": float64}.
+    Mêmes sources que load_meteo (CSV datetime,t_ext ou stockage binaire, alors lu
+    sans copie en float32).
+    """
+    from stockage_meteo import est_stockage, lire_station
+
+    if est_stockage(path_csv):
+        dates, t_ext = lire_station(path_csv, station, debut, fin)
+        return {"datetime": dates, "t_ext": t_ext}
+    with open(path_csv, "r", encoding="utf-8", newline="") as f:
+        lignes = csv.reader(f)
+        entete = next(lignes)
+        i_date, i_t = entete.index("datetime"), entete.index("t_ext")
+        brut = [(l[i_date], l[i_t]) for l in lignes if l]
+    textes = [d for d, _ in brut]
+    try:
+        dates = np.array(textes, dtype="datetime64[s]")
+    except ValueError:  # fuseau horaire, format non ISO : lecture souple par pandas
+        import pandas as pd
+        dates = pd.to_datetime(pd.Series(textes)).to_numpy().astype("datetime64[s]")
+    t_ext = np.array([t for _, t in brut], dtype=float)
+    if len(dates) > 1 and (dates[1:] < dates[:-1]).any():
+        ordre = np.argsort(dates, kind="stable")
+        dates, t_ext = dates[ordre], t_ext[ordre]
+    return {"datetime": dates, "t_ext": t_ext}
+
+def tableaux_meteo(meteo):
+    """(dates, t_ext) d'une météo en tableaux (lire_meteo) ou en DataFrame (load_meteo)."""
+    if isinstance(meteo, dict):
+        return meteo["datetime"], meteo["t_ext"]
+    return meteo.index.values, meteo["t_ext"].to_numpy()
+
+def load_meteo(path_csv: str, station: str = None, debut=None, fin=None):
     """
     Charge un CSV avec colonnes: datetime (ISO) , t_ext (°C)
     Retourne un DataFrame indexé par datetime (pd.DatetimeIndex).
+    path_csv peut aussi être un stockage binaire (stockage_meteo) : on lit alors la
+    tranche station/[debut, fin) sans copie (t_ext en float32).
     """
+    import pandas as pd
+    from stockage_meteo import est_stockage, lire_station
+
+    if est_stockage(path_csv):
+        dates, t_ext = lire_station(path_csv, station, debut, fin)
+        index = pd.DatetimeIndex(dates, name="datetime", copy=False)
+        return pd.DataFrame({"t_ext": t_ext}, index=index, copy=False)
     df = pd.read_csv(path_csv)
     df["datetime"] = pd.to_datetime(df["datetime"])
     df = df.set_index("datetime").sort_index()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# Modèle COP vectorisé : courbe générique EN 14825 ou grille constructeur
+# (COP indexé par T_ext × T_depart), évaluée sur toutes les heures d'un coup.
+import os
+import csv
+import json
+import numpy as np
+
+from cache_fichiers import charger_fichier
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+GRILLES_DIR = os.path.join(DATA_DIR, "pac")
+
+COP_MIN, COP_MAX = 1.0, 5.5
+
+def cop_generique(t_ext, t_depart=50):
+    """Version tableau de simulateur.cop_pac (mêmes coefficients, même bornage)."""
+    base = 3.2 + 0.07 * (np.asarray(t_ext, dtype=float) - 7) - 0.015 * (np.asarray(t_depart, dtype=float) - 35)
+    return np.clip(base, COP_MIN, COP_MAX)
+
+# ------------------ Grilles constructeur ------------------
+
+def _compiler_grille(t_ext, t_depart, cop) -> dict:
+    t_ext = np.asarray(t_ext, dtype=float)
+    t_depart = np.asarray(t_depart, dtype=float)
+    cop = np.asarray(cop, dtype=float)
+    if cop.shape != (len(t_ext), len(t_depart)):
+        raise ValueError("Grille COP : dimensions attendues (len(t_ext), len(t_depart))")
+    if np.isnan(cop).any() or (cop <= 0).any():
+        raise ValueError("Grille COP : valeurs manquantes ou non positives")
+    ie, idp = np.argsort(t_ext), np.argsort(t_depart)
+    return {"t_ext": t_ext[ie], "t_depart": t_depart[idp], "cop": cop[np.ix_(ie, idp)]}
+
+def _lire_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        g = json.load(f)
+    return _compiler_grille(g["t_ext"], g["t_depart"], g["cop"])
+
+def _lire_csv(path):
+    """
+    Deux formats acceptés :
+    - long : colonnes t_ext,t_depart,cop (une ligne par point de mesure) ;
+    - matrice : première colonne t_ext, en-têtes = T_depart, cellules = COP.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = [r for r in csv.reader(f) if r]
+    entete = [c.strip() for c in rows[0]]
+    if entete[:3] == ["t_ext", "t_depart", "cop"]:
+        pts = np.array([[float(x) for x in r[:3]] for r in rows[1:]])
+        te, td = np.unique(pts[:, 0]), np.unique(pts[:, 1])
+        cop = np.full((len(te), len(td)), np.nan)
+        cop[np.searchsorted(te, pts[:, 0]), np.searchsorted(td, pts[:, 1])] = pts[:, 2]
+        return _compiler_grille(te, td, cop)
+    td = [float(x) for x in entete[1:]]
+    te = [float(r[0]) for r in rows[1:]]
+    cop = [[float(x) for x in r[1:]] for r in rows[1:]]
+    return _compiler_grille(te, td, cop)
+
+def _lire_grille(path):
+    return _lire_csv(path) if path.lower().endswith(".csv") else _lire_json(path)
+
+def chemin_grille_cop(modele: str) -> str:
+    """Fichier de la grille : chemin CSV/JSON, ou nom d'un fichier de data/pac/ (sans extension)."""
+    if os.path.exists(modele):
+        return modele
+    for ext in (".json", ".csv"):
+        candidat = os.path.join(GRILLES_DIR, modele + ext)
+        if os.path.exists(candidat):
+            return candidat
+    raise FileNotFoundError("Grille COP introuvable : {}".format(modele))
+
+def charger_grille_cop(modele: str) -> dict:
+    """
+    Grille COP d'un modèle de PAC, compilée une seule fois et partagée par
+    tous les clients qui l'utilisent (cache invalidé si le fichier change).
+    - modele : chemin CSV/JSON, ou nom d'un fichier de data/pac/ (sans extension).
+    """
+    return charger_fichier(chemin_grille_cop(modele), _lire_grille)
+
+def _interp_axe(axe, x):
+    """Indices bas et poids pour une interpolation linéaire, bornée aux extrémités."""
+    if len(axe) == 1:
+        z = np.zeros(np.shape(x), dtype=np.intp)
+        return z, z, np.zeros(np.shape(x))
+    x = np.clip(x, axe[0], axe[-1])
+    i = np.searchsorted(axe, x, side="right").clip(1, len(axe) - 1) - 1
+    w = (x - axe[i]) / (axe[i + 1] - axe[i])
+    return i, i + 1, w
+
+def cop_grille(grille: dict, t_ext, t_depart=50):
+    """Interpolation bilinéaire de la grille sur des tableaux (hors grille : valeur du bord)."""
+    t_ext, t_depart = np.broadcast_arrays(np.asarray(t_ext, dtype=float), np.asarray(t_depart, dtype=float))
+    i0, i1, wi = _interp_axe(grille["t_ext"], t_ext)
+    j0, j1, wj = _interp_axe(grille["t_depart"], t_depart)
+    c = grille["cop"]
+    return ((1 - wi) * ((1 - wj) * c[i0, j0] + wj * c[i0, j1])
+            + wi * ((1 - wj) * c[i1, j0] + wj * c[i1, j1]))
+
+def cop_horaire(client: dict, t_ext, t_depart=None):
+    """COP heure par heure : grille client["modele_pac"] si fournie, sinon courbe générique."""
+    if t_depart is None:
+        t_depart = float(client.get("t_depart_pac", 50))
+    modele = client.get("modele_pac")
+    if modele:
+        return cop_grille(charger_grille_cop(modele), t_ext, t_depart)
+    return cop_generique(t_ext, t_depart)
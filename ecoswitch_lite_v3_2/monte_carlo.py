@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# Ensemble Monte Carlo : incertitude sur UA, rendement chaudière, prix futurs et
+# année météo -> bandes de percentiles (coûts, CO₂), probabilité de chaque verdict
+# et distribution de l'EcoScore.
+#
+# Pas d'hybride piloté dans l'ensemble : son planning (programmation dynamique sur
+# toute la saison) serait à refaire pour chaque tirage. Le verdict 3 est donc exclu
+# et proba_verdicts ne porte que sur VERDICTS_SANS_PILOTAGE.
+#
+# Pour une année météo donnée, le registre énergétique est construit une fois pour
+# UA = 1 W/K (le besoin est linéaire en UA) ; chaque tirage ne coûte ensuite qu'un
+# searchsorted par période tarifaire. 10 000 tirages × 8760 h tiennent en quelques
+# dizaines de millisecondes. Pas d'arrondi horaire à 1e-4 kWh (écart négligeable).
+import numpy as np
+
+from meteo_data import tableaux_meteo
+from noyau_calcul import CO2_ELEC, CO2_GAZ, ecart_temperature
+from modele_cop import cop_horaire
+from tarifs import grille_tarifaire, periodes_horaires, calendrier_client
+from registre_energie import construire_registre, energies_tirages
+from verdict_engine import VERDICTS_SANS_PILOTAGE, codes_verdict
+from eco_score import ecoscores
+
+PARAMETRES = ("ua_w_k", "rendement_chaudiere", "prix_elec", "prix_gaz")
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Bornes physiques appliquées après tirage
+BORNES = {
+    "ua_w_k": (1.0, None),
+    "rendement_chaudiere": (0.3, 1.1),
+    "prix_elec": (1e-4, None),
+    "prix_gaz": (1e-4, None),
+}
+
+def lois_par_defaut(client: dict) -> dict:
+    """
+    Lois centrées sur le client. prix_elec : €/kWh en tarif base ; en HP/HC ou Tempo,
+    facteur appliqué à toute la grille tarifaire (comme balayage).
+    """
+    base = client.get("mode_tarif", "base") not in ("hp_hc", "tempo")
+    ua = float(client["ua_w_k"])
+    eta = float(client["rendement_chaudiere"])
+    eta_max = BORNES["rendement_chaudiere"][1]
+    return {
+        "ua_w_k": {"loi": "normale", "moyenne": ua, "ecart_type": 0.15 * ua},
+        "rendement_chaudiere": {"loi": "triangulaire", "min": eta - 0.06, "mode": eta, "max": max(eta, min(eta + 0.02, eta_max))},
+        "prix_elec": {"loi": "lognormale", "mediane": float(client["prix_elec_eur_kwh"]) if base else 1.0, "sigma": 0.2},
+        "prix_gaz": {"loi": "lognormale", "mediane": float(client["prix_gaz_eur_kwh"]), "sigma": 0.3},
+    }
+
+def tirer(rng, loi, n: int) -> np.ndarray:
+    """
+    n tirages d'une loi :
+    - nombre : constante
+    - {"loi": "normale", "moyenne", "ecart_type"}
+    - {"loi": "lognormale", "mediane", "sigma"} (sigma en log)
+    - {"loi": "uniforme", "min", "max"}
+    - {"loi": "triangulaire", "min", "mode", "max"}
+    - {"loi": "empirique", "valeurs": [...]} (tirage avec remise)
+    """
+    if not isinstance(loi, dict):
+        return np.full(n, float(loi))
+    nom = loi["loi"]
+    if nom == "normale":
+        return rng.normal(loi["moyenne"], loi["ecart_type"], n)
+    if nom == "lognormale":
+        return loi["mediane"] * np.exp(rng.normal(0.0, loi["sigma"], n))
+    if nom == "uniforme":
+        return rng.uniform(loi["min"], loi["max"], n)
+    if nom == "triangulaire":
+        return rng.triangular(loi["min"], loi["mode"], loi["max"], n)
+    if nom == "empirique":
+        return rng.choice(np.asarray(loi["valeurs"], dtype=float), n)
+    raise ValueError("Loi inconnue : {}".format(nom))
+
+def _registre_unitaire(client: dict, meteo, tarif: dict) -> dict:
+    """Registre d'une année météo pour UA = 1 W/K (besoin en kWh par W/K)."""
+    dates, t_ext = tableaux_meteo(meteo)
+    t_ext = np.asarray(t_ext, dtype=float)
+    e_unit = ecart_temperature(float(client["t_confort"]), t_ext) / 1000.0
+    cop = cop_horaire(client, t_ext)
+    codes = periodes_horaires(tarif, dates, calendrier_client(client))
+    return construire_registre(e_unit, cop, codes, tarif["periodes"], tarif["prix"], 1.0, 1.0)
+
+def _bandes(x, percentiles) -> dict:
+    return {p: float(v) for p, v in zip(percentiles, np.percentile(x, percentiles))}
+
+def simuler_incertitudes(client: dict, meteos, n_tirages: int = 10000, lois: dict = None,
+                         graine=None, poids_meteo=None, percentiles=PERCENTILES) -> dict:
+    """
+    - meteos : météo (DataFrame ou tableaux lire_meteo), ou liste/dict de météos (une par année)
+    - lois : surcharge des lois par paramètre (voir tirer) ; les autres restent par défaut
+    - graine : graine du générateur (résultats reproductibles)
+    - poids_meteo : probabilités de tirage des années météo (uniforme par défaut)
+    """
+    nommees = isinstance(meteos, dict) and "t_ext" not in meteos  # {année: météo}
+    noms_meteo = list(meteos) if nommees else None
+    meteos = list(meteos.values()) if nommees else (
+        list(meteos) if isinstance(meteos, (list, tuple)) else [meteos])
+    rng = np.random.default_rng(graine)
+    n = int(n_tirages)
+    if n < 1:
+        raise ValueError("n_tirages : au moins 1 tirage attendu ({})".format(n_tirages))
+
+    specs = lois_par_defaut(client)
+    specs.update(lois or {})
+    tirages = {}
+    for p in PARAMETRES:
+        lo, hi = BORNES[p]
+        tirages[p] = np.clip(tirer(rng, specs[p], n), lo, hi)
+    tirages["meteo"] = rng.choice(len(meteos), n, p=poids_meteo)
+
+    tarif = grille_tarifaire(client)
+    prix_ref = np.ones(len(tarif["periodes"])) if tarif["mode"] == "base" else tarif["prix"]
+    ua, eta, pg = tirages["ua_w_k"], tirages["rendement_chaudiere"], tirages["prix_gaz"]
+    prix = tirages["prix_elec"][:, None] * prix_ref[None, :]     # (N, périodes)
+
+    # Quantités par UA unitaire, remplies année météo par année météo
+    utile, elec_pac, cout_pac_u, u_pac, elec_hyb, cout_hyb_u, cop_med = (np.empty(n) for _ in range(7))
+    for y, meteo in enumerate(meteos):
+        sel = tirages["meteo"] == y
+        if not sel.any():
+            continue
+        reg = _registre_unitaire(client, meteo, tarif)
+        e = energies_tirages(reg, prix[sel], pg[sel], eta[sel])
+        utile[sel] = e["utile"].sum()
+        elec_pac[sel] = e["elec_pac"].sum()
+        cout_pac_u[sel] = prix[sel] @ e["elec_pac"]
+        u_pac[sel] = e["utile_pac_hybride"]
+        elec_hyb[sel] = e["elec_hybride"].sum(axis=-1)
+        cout_hyb_u[sel] = (prix[sel] * e["elec_hybride"]).sum(axis=-1)
+        cop_med[sel] = reg["cop_median"]
+
+    gaz_in = ua * utile / eta
+    gaz_hyb = ua * (utile - u_pac) / eta
+    a = {
+        "energie_utile_kWh": ua * utile,
+        "cop_median": cop_med,
+        "energie_in_pac_kWh": ua * elec_pac,
+        "cout_pac_eur": ua * cout_pac_u,
+        "co2_pac_kg": ua * elec_pac * CO2_ELEC,
+        "energie_in_gaz_kWh": gaz_in,
+        "cout_gaz_eur": gaz_in * pg,
+        "co2_gaz_kg": gaz_in * CO2_GAZ,
+        "energie_in_hybride_elec_kWh": ua * elec_hyb,
+        "energie_in_hybride_gaz_kWh": gaz_hyb,
+        "cout_hybride_eur": ua * cout_hyb_u + gaz_hyb * pg,
+        "co2_hybride_kg": ua * elec_hyb * CO2_ELEC + gaz_hyb * CO2_GAZ,
+    }
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a["part_utile_pac_hybride_%"] = np.where(utile > 0, 100.0 * u_pac / utile, 0.0)
+
+    codes = codes_verdict(a["cout_pac_eur"], a["cout_gaz_eur"], a["cout_hybride_eur"], a["cop_median"])
+    scores = ecoscores(a["cout_gaz_eur"], a["cout_hybride_eur"], a["co2_gaz_kg"], a["co2_hybride_kg"])
+    bandes = [k for k in a if k.startswith(("cout_", "co2_"))]
+    return {
+        "n_tirages": n,
+        "graine": graine,
+        "meteos": noms_meteo,
+        "tirages": tirages,
+        "aggregats": a,
+        "code_verdict": codes,
+        "ecoscore": scores,
+        "percentiles": {k: _bandes(a[k], percentiles) for k in bandes},
+        "proba_verdicts": {v: float(np.mean(codes == i)) for i, v in enumerate(VERDICTS_SANS_PILOTAGE)},
+        "ecoscore_distribution": {
+            "moyenne": float(scores.mean()),
+            "percentiles": _bandes(scores, percentiles),
+            "histogramme": np.bincount(scores, minlength=101),
+        },
+    }
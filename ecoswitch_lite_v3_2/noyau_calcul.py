@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+# Noyau de calcul NumPy partagé par simulate_chauffage (1 client) et la flotte
+# (clients × heures). Toutes les fonctions diffusent sur les axes de tête :
+# l'axe horaire est toujours le dernier.
+import warnings
+import numpy as np
+
+# Facteurs CO2 (France, ordre de grandeur)
+CO2_ELEC = 0.06   # kg/kWh
+CO2_GAZ  = 0.227  # kg/kWh
+
+# Clés des agrégats, dans l'ordre de simulate_chauffage
+CLES_AGREGATS = (
+    "energie_utile_kWh", "cop_median",
+    "energie_in_pac_kWh", "cout_pac_eur", "co2_pac_kg",
+    "energie_in_gaz_kWh", "cout_gaz_eur", "co2_gaz_kg",
+    "energie_in_hybride_elec_kWh", "energie_in_hybride_gaz_kWh", "cout_hybride_eur", "co2_hybride_kg",
+    "part_utile_pac_hybride_%",
+)
+
+# Mode agrégats seuls : heures traitées par tranches (une année bissextile), ce qui
+# borne les temporaires pour les séries pluriannuelles
+TRANCHE_HEURES = 8784
+
+def division_sure(num, den):
+    """num / den avec 0 à la place des infinis/NaN (équivalent replace(inf)/fillna(0))."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        q = np.divide(num, den)
+    return np.where(np.isfinite(q), q, 0.0)
+
+def ecart_temperature(t_confort, t_ext):
+    return np.clip(np.asarray(t_confort, dtype=float) - t_ext, 0.0, None)
+
+def energie_utile(ua, d_t):
+    """Besoin utile horaire (kWh), arrondi comme la version historique."""
+    return np.round(np.asarray(ua, dtype=float) * d_t / 1000.0, 4)
+
+def scenarios(e_utile, cop, prix_elec, prix_gaz, eta_gaz) -> dict:
+    """
+    Colonnes horaires des 3 scénarios (Gaz seul, PAC seule, Hybride).
+    Les noms sont ceux du DataFrame `horaires` de simulate_chauffage.
+    """
+    c = {}
+    # Scénario Gaz seul
+    c["E_gaz_kWh_in"] = division_sure(e_utile, eta_gaz)
+    c["Cout_gaz_eur"] = c["E_gaz_kWh_in"] * prix_gaz
+    c["CO2_gaz_kg"] = c["E_gaz_kWh_in"] * CO2_GAZ
+
+    # Scénario PAC seule
+    c["E_elec_pac_kWh_in"] = division_sure(e_utile, cop)
+    c["Cout_pac_eur"] = c["E_elec_pac_kWh_in"] * prix_elec
+    c["CO2_pac_kg"] = c["E_elec_pac_kWh_in"] * CO2_ELEC
+
+    # Coût utile instantané (€/kWh_utile)
+    c["cout_utile_pac"] = prix_elec / cop
+    c["cout_utile_gaz"] = np.broadcast_to(prix_gaz / np.asarray(eta_gaz, dtype=float), c["cout_utile_pac"].shape)
+
+    # Scénario Hybride : choisir le moins cher à l'heure
+    use_pac = c["cout_utile_pac"] <= c["cout_utile_gaz"]
+    c["E_utile_pac_kWh"] = np.where(use_pac, e_utile, 0.0)
+    c["E_utile_gaz_kWh"] = np.where(~use_pac, e_utile, 0.0)
+
+    c["E_elec_hybride_kWh_in"] = division_sure(c["E_utile_pac_kWh"], cop)
+    c["E_gaz_hybride_kWh_in"] = division_sure(c["E_utile_gaz_kWh"], eta_gaz)
+
+    c["Cout_hybride_eur"] = c["E_elec_hybride_kWh_in"] * prix_elec + c["E_gaz_hybride_kWh_in"] * prix_gaz
+    c["CO2_hybride_kg"] = c["E_elec_hybride_kWh_in"] * CO2_ELEC + c["E_gaz_hybride_kWh_in"] * CO2_GAZ
+    return c
+
+def cop_median(e_utile, cop):
+    """Médiane du COP sur les heures avec besoin (> 0) ; NaN si aucune."""
+    cop = np.broadcast_to(cop, np.shape(e_utile))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmedian(np.where(e_utile > 0, cop, np.nan), axis=-1)
+
+def agreger(e_utile, cop, c: dict) -> dict:
+    """Agrégats (mêmes clés que simulate_chauffage) réduits sur l'axe horaire."""
+    s = lambda k: c[k].sum(axis=-1)
+    utile_tot = e_utile.sum(axis=-1)
+    useful_pac = s("E_utile_pac_kWh")
+    aggregats = {
+        "energie_utile_kWh": utile_tot,
+        "cop_median": cop_median(e_utile, cop),
+
+        "energie_in_pac_kWh": s("E_elec_pac_kWh_in"),
+        "cout_pac_eur": s("Cout_pac_eur"),
+        "co2_pac_kg": s("CO2_pac_kg"),
+
+        "energie_in_gaz_kWh": s("E_gaz_kWh_in"),
+        "cout_gaz_eur": s("Cout_gaz_eur"),
+        "co2_gaz_kg": s("CO2_gaz_kg"),
+
+        "energie_in_hybride_elec_kWh": s("E_elec_hybride_kWh_in"),
+        "energie_in_hybride_gaz_kWh": s("E_gaz_hybride_kWh_in"),
+        "cout_hybride_eur": s("Cout_hybride_eur"),
+        "co2_hybride_kg": s("CO2_hybride_kg"),
+    }
+    # Part d'énergie utile couverte par PAC en mode Hybride
+    aggregats["part_utile_pac_hybride_%"] = np.where(utile_tot > 0, 100.0 * division_sure(useful_pac, utile_tot), 0.0)
+    return aggregats
+
+# --- Mode agrégats seuls : expressions fusionnées, sommes directes -------------------
+
+def energie_utile_directe(ua, t_confort, t_ext, dtype=np.float64):
+    """ecart_temperature puis energie_utile dans un seul tableau (opérations en place)."""
+    e = np.subtract(t_confort, t_ext, dtype=dtype)
+    np.maximum(e, 0.0, out=e)
+    np.multiply(e, np.asarray(ua, dtype=dtype), out=e)
+    np.divide(e, dtype(1000.0), out=e)
+    return np.round(e, 4, out=e)
+
+def sommes_scenarios(e_utile, cop, prix_elec, prix_gaz, eta_gaz) -> dict:
+    """
+    Sommes horaires nécessaires aux agrégats, sans matérialiser les colonnes de scenarios :
+    deux temporaires flottants et un masque. Accumulation en float64 même en float32.
+    Les sommes sont additives : on peut les cumuler tranche par tranche.
+    """
+    somme = lambda x, ou=None: np.sum(x, axis=-1, dtype=np.float64, where=True if ou is None else ou)
+    q = np.divide(e_utile, cop, out=np.zeros_like(e_utile), where=cop != 0)  # élec PAC (kWh)
+    with np.errstate(divide="ignore"):
+        r = np.divide(prix_elec, cop)                                          # coût utile PAC
+    seuil = np.asarray(prix_gaz, dtype=float) / np.asarray(eta_gaz, dtype=float)
+    pac = r <= seuil                                                           # heure en PAC (hybride)
+    qp = np.multiply(q, prix_elec, out=r)                                      # coût PAC horaire
+    s = {
+        "utile": somme(e_utile),
+        "elec_pac": somme(q),
+        "cout_pac": somme(qp),
+        "utile_pac": somme(e_utile, pac),
+        "elec_hybride": somme(q, pac),
+        "cout_hybride_elec": somme(qp, pac),
+    }
+    s["utile_gaz"] = somme(e_utile, np.logical_not(pac, out=pac))
+    return s
+
+def cumuler_sommes(total: dict, s: dict) -> dict:
+    if not total:
+        return dict(s)
+    return {k: total[k] + s[k] for k in total}
+
+def mediane_exacte(valeurs) -> float:
+    """Médiane exacte d'un vecteur par np.partition (NaN si vide)."""
+    n = len(valeurs)
+    if n == 0:
+        return np.nan
+    k = ((n - 1) // 2, n // 2)
+    p = np.partition(valeurs, k)
+    return (float(p[k[0]]) + float(p[k[1]])) / 2
+
+def cop_median_exact(e_utile, cop):
+    """cop_median sans NaN intermédiaires : partition (1 client) ou tri par ligne (bloc)."""
+    cop = np.broadcast_to(cop, np.shape(e_utile))
+    besoin = e_utile > 0
+    if cop.ndim == 1:
+        return mediane_exacte(cop[besoin])
+    v = np.sort(np.where(besoin, cop, np.inf), axis=-1)   # heures sans besoin rejetées en fin
+    n = besoin.sum(axis=-1)
+    lo = np.take_along_axis(v, np.maximum((n - 1) // 2, 0)[..., None], axis=-1)[..., 0]
+    hi = np.take_along_axis(v, (n // 2)[..., None].clip(0, v.shape[-1] - 1), axis=-1)[..., 0]
+    return np.where(n > 0, (lo.astype(float) + hi.astype(float)) / 2, np.nan)
+
+def agregats_depuis_sommes(s: dict, cop_med, prix_gaz, eta_gaz) -> dict:
+    """Agrégats (mêmes clés et sens que agreger) à partir de sommes_scenarios."""
+    gaz_in = division_sure(s["utile"], eta_gaz)
+    gaz_hyb = division_sure(s["utile_gaz"], eta_gaz)
+    return {
+        "energie_utile_kWh": s["utile"],
+        "cop_median": cop_med,
+
+        "energie_in_pac_kWh": s["elec_pac"],
+        "cout_pac_eur": s["cout_pac"],
+        "co2_pac_kg": s["elec_pac"] * CO2_ELEC,
+
+        "energie_in_gaz_kWh": gaz_in,
+        "cout_gaz_eur": gaz_in * prix_gaz,
+        "co2_gaz_kg": gaz_in * CO2_GAZ,
+
+        "energie_in_hybride_elec_kWh": s["elec_hybride"],
+        "energie_in_hybride_gaz_kWh": gaz_hyb,
+        "cout_hybride_eur": s["cout_hybride_elec"] + gaz_hyb * prix_gaz,
+        "co2_hybride_kg": s["elec_hybride"] * CO2_ELEC + gaz_hyb * CO2_GAZ,
+
+        "part_utile_pac_hybride_%": np.where(s["utile"] > 0, 100.0 * division_sure(s["utile_pac"], s["utile"]), 0.0),
+    }
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# Scénario « hybride piloté » : l'inertie thermique du logement sert à préchauffer
+# pendant les heures bon marché (heures creuses, jours Tempo bleus) et à laisser
+# dériver la température dans une bande de confort autour de t_confort.
+#
+# Modèle 1 nœud (pas horaire) : C·(T[h+1] - T[h]) = Q[h] - UA·(T[h] - T_ext[h]),
+# Q >= 0 fourni par la source la moins chère de l'heure (PAC ou gaz, comme l'hybride).
+# Planning optimal par programmation dynamique sur une grille de températures
+# intérieures (S états), récurrence arrière en O(S) par heure (minimum suffixe) ;
+# matrices de transition S×S seulement si la puissance de chauffe est bornée.
+#
+# Activé par client["capacite_thermique_kwh_k"] (kWh/K) ; réglages optionnels :
+# bande_confort_bas / bande_confort_haut (°C autour de t_confort), pas_pilotage_c,
+# puissance_max_kw.
+import numpy as np
+
+from noyau_calcul import CO2_ELEC, CO2_GAZ, division_sure
+
+BANDE_BASSE = 0.0     # °C sous t_confort (0 : jamais en dessous de la consigne)
+BANDE_HAUTE = 2.0     # °C de préchauffage au-dessus de la consigne
+PAS = 0.05            # °C entre deux états de la grille
+VALEURS_PAQUET = 2 ** 22  # borne des tableaux (heures × états) matérialisés à la fois
+
+CLES_PILOTE = ("energie_utile_pilote_kWh", "energie_in_pilote_elec_kWh", "energie_in_pilote_gaz_kWh",
+               "cout_pilote_eur", "co2_pilote_kg")
+
+def parametres_pilotage(client: dict):
+    """Réglages du pilotage, ou None si le client n'a pas de capacité thermique renseignée."""
+    if client.get("capacite_thermique_kwh_k") in (None, ""):
+        return None
+    p = client.get("puissance_max_kw")
+    return {
+        "capacite_kwh_k": float(client["capacite_thermique_kwh_k"]),
+        "bande_basse": float(client.get("bande_confort_bas", BANDE_BASSE)),
+        "bande_haute": float(client.get("bande_confort_haut", BANDE_HAUTE)),
+        "pas": float(client.get("pas_pilotage_c", PAS)),
+        "puissance_max_kw": None if p in (None, "") else float(p),
+    }
+
+def optimiser_prechauffage(ua: float, t_confort: float, t_ext, cout_utile, capacite_kwh_k: float,
+                           bande_basse: float = BANDE_BASSE, bande_haute: float = BANDE_HAUTE, pas: float = PAS,
+                           puissance_max_kw: float = None):
+    """
+    Planning de chauffe de coût minimal.
+    - cout_utile : €/kWh utile de chaque heure
+    Retourne (t_int, q) : température intérieure en début d'heure et chaleur fournie (kWh).
+    Départ à t_confort ; sans chauffage, la température dérive vers le point de grille
+    juste en dessous de l'évolution libre.
+    """
+    t_ext = np.asarray(t_ext, dtype=float)
+    cout_utile = np.asarray(cout_utile, dtype=float)
+    n = len(t_ext)
+    lo = t_confort - bande_basse
+    t = lo + pas * np.arange(int(round((bande_basse + bande_haute) / pas)) + 1)
+    args = (t, t_ext, cout_utile, ua / 1000.0, capacite_kwh_k, lo, pas)
+    choix = _arriere_dense(*args, puissance_max_kw) if puissance_max_kw is not None else _arriere(*args)
+
+    # Parcours avant depuis la consigne
+    etats = np.empty(n + 1, dtype=int)
+    etats[0] = int(round(bande_basse / pas))
+    for h in range(n):
+        etats[h + 1] = choix[h, etats[h]]
+    t_int = t[etats]
+    q = np.maximum(capacite_kwh_k * (t_int[1:] - t_int[:-1]) + ua / 1000.0 * (t_int[:-1] - t_ext), 0.0)
+    return t_int[:-1], q
+
+def _paquets(n, taille):
+    for fin in range(n, 0, -taille):
+        yield np.arange(max(fin - taille, 0), fin)
+
+def _arriere(t, t_ext, cout_utile, ua_k, capacite, lo, pas):
+    """
+    Récurrence arrière en O(S) par heure. Depuis l'état i, deux cas :
+    - chauffe (Q >= 0, états j >= j_q) : coût c·(C·T_j - C·T_i + pertes_i), linéaire en T_j,
+      donc min sur j = minimum suffixe de c·C·T_j + V_j ;
+    - dérive libre (Q = 0) vers le point de grille juste sous l'évolution libre (j_min < j_q).
+    Retourne la décision optimale (heures × états).
+    """
+    n, s = len(t_ext), len(t)
+    j = np.arange(s)
+    choix = np.empty((n, s), dtype=np.int16 if s < 2 ** 15 else np.int32)
+    v = np.zeros(s)
+    m = np.full(s + 1, np.inf)          # minimum suffixe, +inf au-delà de la grille
+    arg = np.full(s + 1, s - 1)
+    for h in _paquets(n, max(1, VALEURS_PAQUET // s)):
+        pertes = ua_k * (t[None, :] - t_ext[h, None])                     # (P, S)
+        x = (t[None, :] - pertes / capacite - lo) / pas                   # évolution libre, en pas
+        j_min = np.floor(x + 1e-9).clip(0, s - 1).astype(int)
+        j_q = np.ceil(x - 1e-9).clip(0, s).astype(int)
+        fixe = cout_utile[h, None] * (pertes - capacite * t[None, :])
+        pente = cout_utile[h] * capacite
+        for k in range(len(h) - 1, -1, -1):
+            w = pente[k] * t + v
+            m[:s] = np.minimum.accumulate(w[::-1])[::-1]
+            arg[:s] = np.minimum.accumulate(np.where(w <= m[:s], j, s)[::-1])[::-1]
+            jq, jm = j_q[k], j_min[k]
+            chauffe = m[jq] + fixe[k]
+            derive = np.where(jm < jq, v[jm], np.inf)
+            libre = derive < chauffe
+            choix[h[k]] = np.where(libre, jm, arg[jq])
+            v = np.where(libre, derive, chauffe)
+    return choix
+
+def _arriere_dense(t, t_ext, cout_utile, ua_k, capacite, lo, pas, puissance_max_kw):
+    """Même récurrence avec matrices de transition S×S (puissance de chauffe bornée)."""
+    n, s = len(t_ext), len(t)
+    j = np.arange(s)
+    lignes = np.arange(s)
+    stock = capacite * (t[None, :] - t[:, None])                          # (S, S) : C·(T_j - T_i)
+    choix = np.empty((n, s), dtype=np.int16 if s < 2 ** 15 else np.int32)
+    v = np.zeros(s)
+    for h in _paquets(n, max(1, VALEURS_PAQUET // (s * s))):
+        pertes = ua_k * (t[None, :] - t_ext[h, None])                     # (P, S)
+        q = stock[None] + pertes[:, :, None]                              # (P, S, S)
+        j_min = np.floor((t[None, :] - pertes / capacite - lo) / pas + 1e-9).clip(0, s - 1)
+        cout = cout_utile[h, None, None] * np.maximum(q, 0.0)
+        cout[j[None, None, :] < j_min[:, :, None]] = np.inf               # refroidir plus vite que la dérive
+        cout[q > puissance_max_kw] = np.inf
+        for k in range(len(h) - 1, -1, -1):
+            tot = cout[k] + v[None, :]
+            a = tot.argmin(axis=1)
+            choix[h[k]] = a
+            v = tot[lignes, a]
+    return choix
+
+def scenario_pilote(client: dict, t_ext, cop, prix_elec) -> dict:
+    """
+    Colonnes horaires du scénario piloté (noms du DataFrame horaires) et agrégats
+    (clés CLES_PILOTE). None si le pilotage n'est pas activé pour ce client.
+    """
+    p = parametres_pilotage(client)
+    if p is None:
+        return None
+    eta_gaz = float(client["rendement_chaudiere"])
+    prix_gaz = float(client["prix_gaz_eur_kwh"])
+    cout_pac = prix_elec / cop
+    cout_gaz = prix_gaz / eta_gaz
+    t_int, q = optimiser_prechauffage(float(client["ua_w_k"]), float(client["t_confort"]), t_ext,
+                                      np.minimum(cout_pac, cout_gaz), p["capacite_kwh_k"], p["bande_basse"],
+                                      p["bande_haute"], p["pas"], p["puissance_max_kw"])
+    pac = cout_pac <= cout_gaz
+    c = {"T_int_pilote": t_int, "E_utile_pilote_kWh": q}
+    c["E_elec_pilote_kWh_in"] = division_sure(np.where(pac, q, 0.0), cop)
+    c["E_gaz_pilote_kWh_in"] = division_sure(np.where(pac, 0.0, q), eta_gaz)
+    c["Cout_pilote_eur"] = c["E_elec_pilote_kWh_in"] * prix_elec + c["E_gaz_pilote_kWh_in"] * prix_gaz
+    c["CO2_pilote_kg"] = c["E_elec_pilote_kWh_in"] * CO2_ELEC + c["E_gaz_pilote_kWh_in"] * CO2_GAZ
+    agregats = {
+        "energie_utile_pilote_kWh": float(q.sum()),
+        "energie_in_pilote_elec_kWh": float(c["E_elec_pilote_kWh_in"].sum()),
+        "energie_in_pilote_gaz_kWh": float(c["E_gaz_pilote_kWh_in"].sum()),
+        "cout_pilote_eur": float(c["Cout_pilote_eur"].sum()),
+        "co2_pilote_kg": float(c["CO2_pilote_kg"].sum()),
+    }
+    return {"horaires": c, "aggregats": agregats}
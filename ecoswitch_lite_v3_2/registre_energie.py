@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# Registre énergétique indépendant des prix.
+# Pour une affectation fixe des heures aux périodes tarifaires, tous les coûts sont
+# linéaires en prix : on garde les énergies par période, et pour l'hybride les COP
+# triés de chaque période (points de bascule PAC/gaz). Un changement de prix se
+# réévalue alors en O(périodes × log heures), sans repasser par les séries horaires.
+import numpy as np
+
+from noyau_calcul import CO2_ELEC, CO2_GAZ, division_sure, cop_median
+
+def construire_registre(e_utile, cop, codes, periodes, prix_elec, prix_gaz, eta_gaz) -> dict:
+    """
+    - e_utile, cop : séries horaires (kWh utiles, COP)
+    - codes : indice de période tarifaire de chaque heure (tarifs.periodes_horaires)
+    - periodes, prix_elec : libellés et prix de référence des périodes
+    - prix_gaz, eta_gaz : prix du gaz de référence et rendement chaudière
+    """
+    e_utile = np.asarray(e_utile, dtype=float)
+    cop = np.broadcast_to(np.asarray(cop, dtype=float), e_utile.shape)
+    nb = len(periodes)
+
+    actif = e_utile > 0
+    e, c, k = e_utile[actif], cop[actif], np.asarray(codes)[actif]
+    ordre = np.lexsort((c, k))  # par période, puis COP croissant
+    e, c, k = e[ordre], c[ordre], k[ordre]
+    e_elec = division_sure(e, c)
+
+    # Sommes suffixes : cumul[i] = somme des heures i.. (la PAC couvre le haut de chaque période)
+    zero = np.zeros(1)
+    return {
+        "periodes": tuple(periodes),
+        "prix_elec": np.asarray(prix_elec, dtype=float).copy(),
+        "prix_gaz": float(prix_gaz),
+        "eta_gaz": float(eta_gaz),
+        "bornes": np.searchsorted(k, np.arange(nb + 1)),
+        "cop": c,  # points de bascule : l'heure passe en PAC si prix_elec / cop <= prix_gaz / eta
+        "cumul_utile": np.concatenate([np.cumsum(e[::-1])[::-1], zero]),
+        "cumul_elec": np.concatenate([np.cumsum(e_elec[::-1])[::-1], zero]),
+        "energie_utile_kWh": float(e_utile.sum()),
+        "cop_median": float(cop_median(e_utile, cop)),
+    }
+
+def _prix_periodes(registre: dict, prix_elec) -> np.ndarray:
+    ref = registre["prix_elec"]
+    if prix_elec is None:
+        return ref
+    if isinstance(prix_elec, dict):
+        p = ref.copy()
+        for nom, v in prix_elec.items():
+            p[registre["periodes"].index(nom)] = float(v)
+        return p
+    p = np.atleast_1d(np.asarray(prix_elec, dtype=float))
+    if p.shape != ref.shape:
+        raise ValueError("prix_elec : un prix par période attendu {}".format(registre["periodes"]))
+    return p
+
+def _premier_pac(cop, lo, hi, prix_e, cout_gaz):
+    """Premier indice de [lo, hi) où la PAC est moins chère (prédicat monotone en COP)."""
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if prix_e / cop[mid] <= cout_gaz:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+def energies_par_periode(registre: dict, prix_elec=None, prix_gaz=None) -> dict:
+    """Énergies (kWh) par période : utile, élec PAC seule, et répartition hybride aux prix donnés."""
+    pe = _prix_periodes(registre, prix_elec)
+    pg = registre["prix_gaz"] if prix_gaz is None else float(prix_gaz)
+    cout_gaz = pg / registre["eta_gaz"]
+    b, cop = registre["bornes"], registre["cop"]
+    su, se = registre["cumul_utile"], registre["cumul_elec"]
+
+    nb = len(pe)
+    bascule = np.array([_premier_pac(cop, b[i], b[i + 1], pe[i], cout_gaz) for i in range(nb)], dtype=int)
+    fin = b[1:]
+    return {
+        "utile": su[b[:-1]] - su[fin],
+        "elec_pac": se[b[:-1]] - se[fin],
+        "utile_pac_hybride": su[bascule] - su[fin],
+        "elec_hybride": se[bascule] - se[fin],
+    }
+
+def reevaluer(registre: dict, prix_elec=None, prix_gaz=None) -> dict:
+    """
+    Agrégats (mêmes clés que simulate_chauffage) pour de nouveaux prix, sans recalcul horaire.
+    - prix_elec : scalaire (tarif base), séquence alignée sur registre["periodes"]
+      ou dict {periode: prix} ; None = prix de référence.
+    - prix_gaz : €/kWh ; None = prix de référence.
+    """
+    pe = _prix_periodes(registre, prix_elec)
+    pg = registre["prix_gaz"] if prix_gaz is None else float(prix_gaz)
+    eta = registre["eta_gaz"]
+    e = energies_par_periode(registre, pe, pg)
+
+    utile_tot = registre["energie_utile_kWh"]
+    elec_pac = e["elec_pac"].sum()
+    gaz_in = utile_tot / eta
+    elec_hyb = e["elec_hybride"].sum()
+    utile_pac = e["utile_pac_hybride"].sum()
+    gaz_hyb = (e["utile"].sum() - utile_pac) / eta
+    cout_elec_hyb = float(pe @ e["elec_hybride"])
+
+    aggregats = {
+        "energie_utile_kWh": utile_tot,
+        "cop_median": registre["cop_median"],
+
+        "energie_in_pac_kWh": elec_pac,
+        "cout_pac_eur": float(pe @ e["elec_pac"]),
+        "co2_pac_kg": elec_pac * CO2_ELEC,
+
+        "energie_in_gaz_kWh": gaz_in,
+        "cout_gaz_eur": gaz_in * pg,
+        "co2_gaz_kg": gaz_in * CO2_GAZ,
+
+        "energie_in_hybride_elec_kWh": elec_hyb,
+        "energie_in_hybride_gaz_kWh": gaz_hyb,
+        "cout_hybride_eur": cout_elec_hyb + gaz_hyb * pg,
+        "co2_hybride_kg": elec_hyb * CO2_ELEC + gaz_hyb * CO2_GAZ,
+
+        "part_utile_pac_hybride_%": (100.0 * utile_pac / utile_tot) if utile_tot > 0 else 0.0,
+    }
+    return {k: float(v) for k, v in aggregats.items()}
+
+def energies_tirages(registre: dict, prix_elec, prix_gaz, eta_gaz) -> dict:
+    """
+    Version vectorisée d'energies_par_periode pour N jeux de prix/rendement à la fois.
+    - prix_elec : (N, périodes) ; prix_gaz, eta_gaz : (N,)
+    La bascule utilise un searchsorted sur le seuil COP >= prix_elec · eta / prix_gaz
+    (égalités exactes près). Retourne utile et elec_pac (périodes,), utile_pac_hybride (N,)
+    et elec_hybride (N, périodes).
+    """
+    prix_elec = np.atleast_2d(np.asarray(prix_elec, dtype=float))
+    prix_gaz = np.asarray(prix_gaz, dtype=float)
+    eta_gaz = np.asarray(eta_gaz, dtype=float)
+    b, cop = registre["bornes"], registre["cop"]
+    su, se = registre["cumul_utile"], registre["cumul_elec"]
+    lo, fin = b[:-1], b[1:]
+
+    with np.errstate(divide="ignore"):
+        seuil = prix_elec * (eta_gaz / prix_gaz)[:, None]
+    bascule = np.empty(seuil.shape, dtype=np.intp)
+    for i in range(len(lo)):
+        bascule[:, i] = lo[i] + np.searchsorted(cop[lo[i]:fin[i]], seuil[:, i], side="left")
+    return {
+        "utile": su[lo] - su[fin],
+        "elec_pac": se[lo] - se[fin],
+        "utile_pac_hybride": (su[bascule] - su[fin]).sum(axis=-1),
+        "elec_hybride": se[bascule] - se[fin],
+    }
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+# Service HTTP local (asyncio, bibliothèque standard) au-dessus du calcul de flotte :
+# météo et tarifs chargés une fois au démarrage, résidents en mémoire.
+#   POST /simuler        un client (JSON)           -> sa ligne de résultat (JSON)
+#   POST /simuler/lot    liste de clients (JSON)    -> liste de lignes (JSON)
+#   POST /simuler/flux   clients en NDJSON          -> lignes en NDJSON, envoyées lot par lot
+#   GET  /sante          état du service (météo, requêtes, micro-lots)
+# Les requêtes unitaires concurrentes sont regroupées en micro-lots (au plus lot_max
+# clients, attente_ms après le premier) simulés en une passe vectorisée (simuler_flotte :
+# mêmes résultats que simulate_chauffage -> recommander_solution -> calculer_ecoscore).
+# Un client invalide n'échoue que lui-même : {"erreur": ...} à sa place dans un lot.
+#
+#   python service.py --meteo data/meteo_demo.csv --port 8765
+#   curl -d @demo_client.json http://127.0.0.1:8765/simuler
+#   python -m benchmarks.charge --demarrer     # générateur de charge (latences, débit)
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from meteo_data import lire_meteo
+from tarifs import charger_hp_hc, charger_tempo
+from flotte import simuler_flotte
+
+HOTE = "127.0.0.1"
+PORT = 8765
+LOT_MAX = 256           # clients par micro-lot
+ATTENTE_MS = 2.0        # attente d'autres requêtes après la première d'un micro-lot
+TAILLE_LOT_FLUX = 1000  # clients simulés par passe en mode flux
+CORPS_MAX = 64 << 20    # octets par requête (hors flux)
+LIGNE_MAX = 1 << 20     # octets par ligne d'en-tête ou de NDJSON
+
+RAISONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           411: "Length Required", 413: "Payload Too Large"}
+TYPE_JSON = "application/json; charset=utf-8"
+TYPE_NDJSON = "application/x-ndjson; charset=utf-8"
+
+def _erreur(e: Exception) -> dict:
+    return {"erreur": "{}: {}".format(type(e).__name__, e)}
+
+def _json(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+class Regroupeur:
+    """
+    File des requêtes unitaires : le premier client arrivé ouvre un micro-lot, complété
+    par les requêtes reçues pendant attente_ms (ou pendant le calcul du lot précédent),
+    jusqu'à lot_max clients.
+    """
+
+    def __init__(self, evaluer, lot_max: int = LOT_MAX, attente_ms: float = ATTENTE_MS):
+        self.evaluer = evaluer
+        self.lot_max = lot_max
+        self.attente = attente_ms / 1e3
+        self.file = asyncio.Queue()
+        self.lots = self.clients = 0
+
+    async def simuler(self, client: dict):
+        """Ligne de résultat du client, ou l'exception levée par sa simulation."""
+        futur = asyncio.get_running_loop().create_future()
+        self.file.put_nowait((client, futur))
+        return await futur
+
+    async def boucle(self):
+        while True:
+            lot = [await self.file.get()]
+            if self.attente > 0 and self.file.qsize() < self.lot_max - 1:
+                await asyncio.sleep(self.attente)
+            while len(lot) < self.lot_max and not self.file.empty():
+                lot.append(self.file.get_nowait())
+            self.lots += 1
+            self.clients += len(lot)
+            resultats = await self.evaluer([c for c, _ in lot])
+            for (_, futur), r in zip(lot, resultats):
+                if not futur.done():  # requête abandonnée (connexion fermée)
+                    futur.set_result(r)
+
+class Service:
+    """Météo, tarifs et cache éventuel résidents ; calcul dans un thread dédié."""
+
+    def __init__(self, path_meteo: str, station: str = None, lot_max: int = LOT_MAX,
+                 attente_ms: float = ATTENTE_MS, cache: str = None):
+        self.meteo = lire_meteo(path_meteo, station)
+        charger_hp_hc()
+        charger_tempo()
+        # Un seul thread de calcul : NumPy y libère le GIL, la boucle asyncio reste réactive
+        self.executeur = ThreadPoolExecutor(max_workers=1, thread_name_prefix="calcul")
+        self.cache = None
+        if cache is not None:
+            from cache_resultats import CacheResultats
+
+            # Connexion SQLite créée (et utilisée) dans le thread de calcul
+            self.cache = self.executeur.submit(CacheResultats, cache).result()
+        self.regroupeur = Regroupeur(self.evaluer, lot_max, attente_ms)
+        self.requetes = 0
+        self.routes = {
+            "/simuler": ("POST", self.simuler_un),
+            "/simuler/lot": ("POST", self.simuler_lot),
+            "/simuler/flux": ("POST", self.simuler_flux),
+            "/sante": ("GET", self.sante),
+        }
+
+    def _calculer(self, clients: list) -> list:
+        try:
+            return simuler_flotte(clients, self.meteo, cache=self.cache)
+        except Exception:
+            if len(clients) == 1:
+                raise
+        # Lot en échec : chaque client seul, pour n'écarter que les invalides
+        resultats = []
+        for c in clients:
+            try:
+                resultats += simuler_flotte([c], self.meteo, cache=self.cache)
+            except Exception as e:
+                resultats.append(e)
+        return resultats
+
+    async def evaluer(self, clients: list) -> list:
+        """Une ligne de résultat (dict) ou une exception par client, dans l'ordre."""
+        if not clients:
+            return []
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executeur, self._calculer, clients)
+        except Exception as e:
+            return [e] * len(clients)
+
+    # --- HTTP -------------------------------------------------------------------------
+
+    async def connexion(self, reader, writer):
+        try:
+            while True:
+                try:
+                    entete = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                ligne, *champs = entete.decode("latin-1").rstrip("\r\n").split("\r\n")
+                try:
+                    methode, cible, version = ligne.split(" ", 2)
+                except ValueError:
+                    await self._repondre(writer, 400, {"erreur": "Ligne de requête invalide"}, garder=False)
+                    return
+                entetes = {}
+                for champ in champs:
+                    nom, _, valeur = champ.partition(":")
+                    entetes[nom.strip().lower()] = valeur.strip()
+                garder = version == "HTTP/1.1" and entetes.get("connection", "").lower() != "close"
+                self.requetes += 1
+                garder = await self._traiter(methode, cible.split("?", 1)[0], entetes, reader, writer, garder)
+                if not garder:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Connexion coupée, corps tronqué ou ligne trop longue : rien à répondre
+            return
+        finally:
+            writer.close()
+
+    async def _traiter(self, methode, chemin, entetes, reader, writer, garder) -> bool:
+        """Répond à une requête ; False si la connexion doit être fermée."""
+        route = self.routes.get(chemin)
+        if route is None:
+            await self._repondre(writer, 404, {"erreur": "Chemin inconnu : {}".format(chemin)}, garder=False)
+            return False
+        if methode != route[0]:
+            await self._repondre(writer, 405, {"erreur": "Méthode attendue : {}".format(route[0])}, garder=False)
+            return False
+        longueur = 0
+        if methode == "POST":
+            if "content-length" not in entetes:
+                await self._repondre(writer, 411, {"erreur": "Content-Length requis"}, garder=False)
+                return False
+            longueur = int(entetes["content-length"]) if entetes["content-length"].isdigit() else -1
+            if longueur < 0:
+                await self._repondre(writer, 400, {"erreur": "Content-Length invalide"}, garder=False)
+                return False
+            if longueur > CORPS_MAX and chemin != "/simuler/flux":
+                await self._repondre(writer, 413, {"erreur": "Corps limité à {} octets".format(CORPS_MAX)},
+                                     garder=False)
+                return False
+        return await route[1](reader, writer, longueur, garder)
+
+    async def _repondre(self, writer, statut: int, corps, garder: bool = True):
+        donnees = corps if isinstance(corps, bytes) else _json(corps)
+        entete = "HTTP/1.1 {} {}\r\nContent-Type: {}\r\nContent-Length: {}\r\nConnection: {}\r\n\r\n".format(
+            statut, RAISONS[statut], TYPE_JSON, len(donnees), "keep-alive" if garder else "close")
+        writer.write(entete.encode("latin-1") + donnees)
+        await writer.drain()
+
+    async def _lire_json(self, reader, writer, longueur: int):
+        try:
+            return json.loads(await reader.readexactly(longueur))
+        except ValueError as e:
+            await self._repondre(writer, 400, _erreur(e))
+            return None
+
+    # --- Points d'entrée ------------------------------------------------------------------
+
+    async def simuler_un(self, reader, writer, longueur: int, garder: bool) -> bool:
+        client = await self._lire_json(reader, writer, longueur)
+        if client is None:
+            return garder
+        if not isinstance(client, dict):
+            await self._repondre(writer, 400, {"erreur": "Un client (objet JSON) attendu"}, garder)
+            return garder
+        r = await self.regroupeur.simuler(client)
+        if isinstance(r, Exception):
+            await self._repondre(writer, 400, _erreur(r), garder)
+        else:
+            await self._repondre(writer, 200, r, garder)
+        return garder
+
+    async def simuler_lot(self, reader, writer, longueur: int, garder: bool) -> bool:
+        clients = await self._lire_json(reader, writer, longueur)
+        if clients is None:
+            return garder
+        if isinstance(clients, dict):
+            clients = clients.get("clients")
+        if not isinstance(clients, list) or not all(isinstance(c, dict) for c in clients):
+            await self._repondre(writer, 400, {"erreur": "Liste de clients (objets JSON) attendue"}, garder)
+            return garder
+        resultats = await self.evaluer(clients)
+        await self._repondre(writer, 200, [_erreur(r) if isinstance(r, Exception) else r for r in resultats], garder)
+        return garder
+
+    async def simuler_flux(self, reader, writer, longueur: int, garder: bool) -> bool:
+        """Lit le NDJSON au fil de l'eau ; chaque lot simulé est renvoyé aussitôt (chunked)."""
+        entete = "HTTP/1.1 200 OK\r\nContent-Type: {}\r\nTransfer-Encoding: chunked\r\nConnection: {}\r\n\r\n".format(
+            TYPE_NDJSON, "keep-alive" if garder else "close")
+        writer.write(entete.encode("latin-1"))
+        restant, tampon, lot = longueur, b"", []  # lot : client (dict) ou erreur de lecture, par ligne
+        while restant > 0:
+            bloc = await reader.read(min(restant, 1 << 16))
+            if not bloc:
+                break
+            restant -= len(bloc)
+            *lignes, tampon = (tampon + bloc).split(b"\n")
+            if restant <= 0:
+                lignes.append(tampon)
+            elif len(tampon) > LIGNE_MAX:
+                raise ValueError("Ligne NDJSON de plus de {} octets".format(LIGNE_MAX))
+            for ligne in lignes:
+                if not ligne.strip():
+                    continue
+                try:
+                    client = json.loads(ligne)
+                    lot.append(client if isinstance(client, dict) else ValueError("objet JSON attendu"))
+                except ValueError as e:
+                    lot.append(e)
+                if len(lot) >= TAILLE_LOT_FLUX:
+                    await self._envoyer_lot(writer, lot)
+                    lot = []
+        if lot:
+            await self._envoyer_lot(writer, lot)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return garder and restant == 0
+
+    async def _envoyer_lot(self, writer, lot: list):
+        valides = [c for c in lot if isinstance(c, dict)]
+        resultats = iter(await self.evaluer(valides))
+        lignes = (next(resultats) if isinstance(c, dict) else c for c in lot)
+        donnees = b"".join(_json(_erreur(r) if isinstance(r, Exception) else r) + b"\n" for r in lignes)
+        writer.write(b"%x\r\n%s\r\n" % (len(donnees), donnees))
+        await writer.drain()
+
+    async def sante(self, reader, writer, longueur: int, garder: bool) -> bool:
+        dates = self.meteo["datetime"]
+        r = self.regroupeur
+        await self._repondre(writer, 200, {
+            "statut": "ok", "heures": len(dates),
+            "debut": str(dates[0]) if len(dates) else None, "fin": str(dates[-1]) if len(dates) else None,
+            "requetes": self.requetes, "micro_lots": r.lots, "clients_regroupes": r.clients,
+            "clients_par_micro_lot": r.clients / r.lots if r.lots else 0.0,
+        }, garder)
+        return garder
+
+    def fermer(self):
+        if self.cache is not None:
+            self.executeur.submit(self.cache.fermer).result()
+        self.executeur.shutdown()
+
+async def servir(service: Service, hote: str = HOTE, port: int = PORT):
+    """Sert jusqu'à interruption ; affiche l'adresse (port 0 : port libre choisi par le système)."""
+    serveur = await asyncio.start_server(service.connexion, hote, port, limit=LIGNE_MAX)
+    boucle = asyncio.create_task(service.regroupeur.boucle())
+    hote, port = serveur.sockets[0].getsockname()[:2]
+    print("✅ Service EcoSwitch : http://{}:{}".format(hote, port), flush=True)
+    try:
+        async with serveur:
+            await serveur.serve_forever()
+    finally:
+        boucle.cancel()
+
+def _args():
+    p = argparse.ArgumentParser(description="Service HTTP de simulation EcoSwitch Lite (local)")
+    p.add_argument("--meteo", default="data/meteo_demo.csv", help="météo horaire (CSV ou stockage binaire)")
+    p.add_argument("--station", help="station à lire si --meteo est un stockage multi-stations")
+    p.add_argument("--hote", default=HOTE, help="adresse d'écoute (défaut : localhost)")
+    p.add_argument("--port", type=int, default=PORT, help="port d'écoute (0 = port libre)")
+    p.add_argument("--lot-max", type=int, default=LOT_MAX, help="clients par micro-lot")
+    p.add_argument("--attente-ms", type=float, default=ATTENTE_MS,
+                   help="attente d'autres requêtes avant de simuler un micro-lot")
+    p.add_argument("--cache", metavar="SQLITE", help="cache disque des résultats (cache_resultats)")
+    return p.parse_args()
+
+if __name__ == "__main__":
+    args = _args()
+    t0 = time.perf_counter()
+    service = Service(args.meteo, args.station, args.lot_max, args.attente_ms, args.cache)
+    print("Météo et tarifs chargés en {:.0f} ms ({} heures)".format(
+        1e3 * (time.perf_counter() - t0), len(service.meteo["t_ext"])), flush=True)
+    try:
+        asyncio.run(servir(service, args.hote, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.fermer()
@@ -1,11 +1,15 @@
 # -*- coding: utf-8 -*-
 import numpy as np
-import pandas as pd
-import json
 
-# Facteurs CO2 (France, ordre de grandeur)
-CO2_ELEC = 0.06   # kg/kWh
-CO2_GAZ  = 0.227  # kg/kWh
+from noyau_calcul import (CO2_ELEC, CO2_GAZ, TRANCHE_HEURES, ecart_temperature, energie_utile, scenarios, agreger,
+                          energie_utile_directe, sommes_scenarios, cumuler_sommes, mediane_exacte,
+                          agregats_depuis_sommes)
+from meteo_data import tableaux_meteo
+from tarifs import grille_tarifaire, periodes_horaires, calendrier_client
+from registre_energie import construire_registre
+from modele_cop import cop_horaire
+from pilotage import scenario_pilote
+from instrumentation import span
 
 def clamp(x, lo, hi):
     return max(lo, min(hi, x))
@@ -23,116 +27,129 @@ def cop_pac(t_ext, t_depart=50):
 def _tarif_base(client):
     return client["prix_elec_eur_kwh"], client["prix_gaz_eur_kwh"]
 
-def _tarif_hp_hc(hour, json_path="data/tarifs_hp_hc.json"):
-    with open(json_path, "r", encoding="utf-8") as f:
-        t = json.load(f)
-    if hour in t["heures_creuses"]:
-        return t["hc_eur_kwh"]
-    return t["hp_eur_kwh"]
-
-def _tarif_tempo(hour, couleur=None, json_path="data/tarifs_tempo.json"):
-    with open(json_path, "r", encoding="utf-8") as f:
-        t = json.load(f)
-    if couleur is None:
-        couleur = t.get("default_couleur", "bleu")
-    hp_hc = t[couleur]
-    if hour in t["heures_creuses"]:
-        return hp_hc["hc"]
-    return hp_hc["hp"]
-
-def simulate_chauffage(client: dict, meteo: pd.DataFrame) -> dict:
+def simulate_chauffage(client: dict, meteo, horaires: bool = True, dtype=np.float64) -> dict:
     """
     Calcule la demande énergétique horaire et compare 3 scénarios :
     - Gaz seul
     - PAC seule
     - Hybride (choix horaire du coût utile le plus bas)
-    Retourne un dict avec agrégats + séries horaires.
+    - Hybride piloté, si client["capacite_thermique_kwh_k"] est renseigné (pilotage.py)
+    Retourne un dict avec agrégats + séries horaires (DataFrame) + registre énergétique
+    (réévaluation des coûts à d'autres prix : registre_energie.reevaluer).
+    meteo : DataFrame (load_meteo) ou tableaux (lire_meteo).
+    horaires=False : agrégats seuls (voir simuler_agregats), dtype float32 possible.
+    Sans besoin de DataFrame (CLI, workers) : simuler_tableaux, qui n'importe pas pandas.
+    """
+    if not horaires:
+        return {"aggregats": simuler_agregats(client, meteo, dtype)}
+    import pandas as pd
+
+    res = simuler_tableaux(client, meteo)
+    colonnes = res["horaires"]
+    dates = colonnes.pop("datetime")
+    if isinstance(meteo, pd.DataFrame):  # conserve les autres colonnes météo
+        df = meteo.copy().rename(columns={"t_ext": "T_ext"})
+        colonnes.pop("T_ext")
+    else:
+        df = pd.DataFrame(index=pd.DatetimeIndex(dates, name="datetime"))
+    for nom, valeurs in colonnes.items():
+        df[nom] = valeurs
+    res["horaires"] = df  # pour export
+    return res
+
+def simuler_tableaux(client: dict, meteo) -> dict:
+    """
+    Cœur NumPy de simulate_chauffage : mêmes agrégats et registre, séries horaires en
+    dict de tableaux ("datetime" puis les colonnes du DataFrame horaires).
     """
     ua = float(client["ua_w_k"])
     t_int = float(client["t_confort"])
     eta_gaz = float(client["rendement_chaudiere"])
     t_depart = float(client.get("t_depart_pac", 50))
-    mode_tarif = client.get("mode_tarif", "base")
+    dates, t_ext = tableaux_meteo(meteo)
+    t_ext = np.asarray(t_ext, dtype=float)
 
-    # Prépare DataFrame
-    df = meteo.copy().rename(columns={"t_ext": "T_ext"})
-    df["dT"] = (t_int - df["T_ext"]).clip(lower=0.0)
     # Besoin utile (kWh) par heure
-    df["E_utile_kWh"] = (ua * df["dT"] / 1000.0).round(4)
-
-    # COP & rendements
-    df["COP"] = df["T_ext"].apply(lambda T: cop_pac(T, t_depart=t_depart))
-
-    # Tarifs élec/ gaz
-    if mode_tarif == "base":
-        prix_elec, prix_gaz = _tarif_base(client)
-        df["prix_elec"] = prix_elec
-        df["prix_gaz"] = prix_gaz
-    elif mode_tarif == "hp_hc":
-        df["prix_elec"] = [ _tarif_hp_hc(ts.hour) for ts in df.index ]
+    with span("energie"):
+        c = {"datetime": dates, "T_ext": t_ext}
+        c["dT"] = ecart_temperature(t_int, t_ext)
+        e_utile = energie_utile(ua, c["dT"])
+        c["E_utile_kWh"] = e_utile
+
+    # COP & rendements (courbe générique ou grille constructeur client["modele_pac"])
+    with span("cop"):
+        cop = cop_horaire(client, t_ext, t_depart)
+        c["COP"] = cop
+
+    # Tarifs élec/ gaz : période tarifaire de chaque heure puis prix par indexation
+    # (Tempo : couleur du jour via client["calendrier_tempo"], sinon couleur par défaut)
+    with span("tarif"):
+        tarif = grille_tarifaire(client)
+        codes = periodes_horaires(tarif, dates, calendrier_client(client))
+        prix_elec = tarif["prix"][codes]
         # gaz constant via client
         _, prix_gaz = _tarif_base(client)
-        df["prix_gaz"] = prix_gaz
-    elif mode_tarif == "tempo":
-        # démo: toute la période en "bleu"
-        df["prix_elec"] = [ _tarif_tempo(ts.hour, couleur="bleu") for ts in df.index ]
-        _, prix_gaz = _tarif_base(client)
-        df["prix_gaz"] = prix_gaz
-    else:
-        # fallback
-        prix_elec, prix_gaz = _tarif_base(client)
-        df["prix_elec"] = prix_elec
-        df["prix_gaz"] = prix_gaz
-
-    # Scénario Gaz seul
-    df["E_gaz_kWh_in"] = (df["E_utile_kWh"] / eta_gaz).fillna(0.0)
-    df["Cout_gaz_eur"] = df["E_gaz_kWh_in"] * df["prix_gaz"]
-    df["CO2_gaz_kg"] = df["E_gaz_kWh_in"] * CO2_GAZ
-
-    # Scénario PAC seule
-    df["E_elec_pac_kWh_in"] = (df["E_utile_kWh"] / df["COP"]).replace([np.inf, -np.inf], 0.0).fillna(0.0)
-    df["Cout_pac_eur"] = df["E_elec_pac_kWh_in"] * df["prix_elec"]
-    df["CO2_pac_kg"] = df["E_elec_pac_kWh_in"] * CO2_ELEC
+        c["prix_elec"] = prix_elec
+        c["prix_gaz"] = np.full(len(t_ext), prix_gaz, dtype=float)
 
-    # Coût utile instantané (€/kWh_utile)
-    df["cout_utile_pac"] = df["prix_elec"] / df["COP"]
-    df["cout_utile_gaz"] = df["prix_gaz"] / eta_gaz
+    # Scénarios Gaz seul / PAC seule / Hybride
+    with span("scenarios"):
+        colonnes = scenarios(e_utile, cop, prix_elec, float(prix_gaz), eta_gaz)
+        c.update(colonnes)
 
-    # Scénario Hybride : choisir le moins cher à l'heure
-    use_pac = df["cout_utile_pac"] <= df["cout_utile_gaz"]
-    df["E_utile_pac_kWh"] = np.where(use_pac, df["E_utile_kWh"], 0.0)
-    df["E_utile_gaz_kWh"] = np.where(~use_pac, df["E_utile_kWh"], 0.0)
+    # Agrégats
+    with span("agregation"):
+        aggregats = {k: float(v) for k, v in agreger(e_utile, cop, colonnes).items()}
 
-    df["E_elec_hybride_kWh_in"] = (df["E_utile_pac_kWh"] / df["COP"]).fillna(0.0)
-    df["E_gaz_hybride_kWh_in"] = (df["E_utile_gaz_kWh"] / eta_gaz).fillna(0.0)
+    # Hybride piloté (inertie thermique, préchauffage) : optionnel
+    with span("pilotage"):
+        pilote = scenario_pilote(client, t_ext, cop, prix_elec)
+        if pilote is not None:
+            c.update(pilote["horaires"])
+            aggregats.update(pilote["aggregats"])
 
-    df["Cout_hybride_eur"] = df["E_elec_hybride_kWh_in"] * df["prix_elec"] + df["E_gaz_hybride_kWh_in"] * df["prix_gaz"]
-    df["CO2_hybride_kg"] = df["E_elec_hybride_kWh_in"] * CO2_ELEC + df["E_gaz_hybride_kWh_in"] * CO2_GAZ
-
-    # Agrégats
-    aggregats = {
-        "energie_utile_kWh": df["E_utile_kWh"].sum(),
-        "cop_median": df.loc[df["E_utile_kWh"] > 0, "COP"].median() if (df["E_utile_kWh"] > 0).any() else float("nan"),
-
-        "energie_in_pac_kWh": df["E_elec_pac_kWh_in"].sum(),
-        "cout_pac_eur": df["Cout_pac_eur"].sum(),
-        "co2_pac_kg": df["CO2_pac_kg"].sum(),
-
-        "energie_in_gaz_kWh": df["E_gaz_kWh_in"].sum(),
-        "cout_gaz_eur": df["Cout_gaz_eur"].sum(),
-        "co2_gaz_kg": df["CO2_gaz_kg"].sum(),
-
-        "energie_in_hybride_elec_kWh": df["E_elec_hybride_kWh_in"].sum(),
-        "energie_in_hybride_gaz_kWh": df["E_gaz_hybride_kWh_in"].sum(),
-        "cout_hybride_eur": df["Cout_hybride_eur"].sum(),
-        "co2_hybride_kg": df["CO2_hybride_kg"].sum(),
-    }
-    # Part d'énergie utile couverte par PAC en mode Hybride
-    utile_tot = df["E_utile_kWh"].sum()
-    useful_pac = df["E_utile_pac_kWh"].sum()
-    aggregats["part_utile_pac_hybride_%"] = (100.0 * useful_pac / utile_tot) if utile_tot > 0 else 0.0
+    with span("registre"):
+        registre = construire_registre(e_utile, cop, codes, tarif["periodes"], tarif["prix"], prix_gaz, eta_gaz)
 
     return {
         "aggregats": aggregats,
-        "horaires": df  # pour export
+        "horaires": c,
+        "registre": registre,
     }
+
+def simuler_agregats(client: dict, meteo, dtype=np.float64, tranche: int = TRANCHE_HEURES) -> dict:
+    """
+    Agrégats seuls, pour les traitements par lots : pas de copie de la météo ni de
+    colonnes horaires, heures traitées par tranches, calcul en float32 si demandé
+    (sommes accumulées en float64). Médiane du COP exacte (np.partition).
+    Mêmes agrégats que simulate_chauffage, à la précision flottante près.
+    """
+    ua = float(client["ua_w_k"])
+    t_int = float(client["t_confort"])
+    eta_gaz = float(client["rendement_chaudiere"])
+    t_depart = float(client.get("t_depart_pac", 50))
+    prix_gaz = float(client["prix_gaz_eur_kwh"])
+
+    dates, t_ext = tableaux_meteo(meteo)
+    tarif = grille_tarifaire(client)
+    grille = tarif["prix"].astype(dtype)
+    calendrier = calendrier_client(client)
+
+    sommes, cops = {}, []
+    for s in range(0, max(len(t_ext), 1), tranche):
+        t = t_ext[s:s + tranche]
+        e = energie_utile_directe(ua, t_int, t, dtype)
+        cop = cop_horaire(client, t, t_depart).astype(dtype, copy=False)
+        prix_elec = grille[periodes_horaires(tarif, dates[s:s + tranche], calendrier)]
+        sommes = cumuler_sommes(sommes, sommes_scenarios(e, cop, prix_elec, prix_gaz, eta_gaz))
+        cops.append(cop[e > 0])
+    cop_med = mediane_exacte(np.concatenate(cops))
+    aggregats = {k: float(v) for k, v in agregats_depuis_sommes(sommes, cop_med, prix_gaz, eta_gaz).items()}
+    # Le planning piloté porte sur toute la série (pas de tranches)
+    if "capacite_thermique_kwh_k" in client:
+        t_ext = t_ext.astype(float)
+        pilote = scenario_pilote(client, t_ext, cop_horaire(client, t_ext, t_depart),
+                                 tarif["prix"][periodes_horaires(tarif, dates, calendrier)])
+        if pilote is not None:
+            aggregats.update(pilote["aggregats"])
+    return aggregats
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Réduction de séries pour l'affichage : Largest-Triangle-Three-Buckets (LTTB,
+# Steinarsson 2013). Garde un nombre fixe de points en conservant la forme (pics,
+# creux, ruptures de pente), là où un pas fixe les manquerait. Le graphique reçoit
+# le même nombre de points quelle que soit la période simulée.
+import numpy as np
+
+POINTS_MAX = 1500
+
+def lttb(x, y, points: int = POINTS_MAX) -> np.ndarray:
+    """
+    Indices (croissants) des points retenus : premier et dernier points, puis dans
+    chacun des points-2 seaux celui qui forme le plus grand triangle avec le point
+    retenu précédent et la moyenne du seau suivant.
+    x : abscisses croissantes (nombres ou datetime64), y : valeurs.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[s]").astype(np.int64)
+    x = x.astype(float) - float(x[0])  # précision des aires sur des epochs
+
+    # Seaux intérieurs [bornes[i], bornes[i+1]) et leurs moyennes, en une passe
+    bornes = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    somme_x = np.concatenate(([0.0], np.cumsum(x)))
+    somme_y = np.concatenate(([0.0], np.cumsum(y)))
+    largeur = np.diff(bornes)
+    moy_x = (somme_x[bornes[1:]] - somme_x[bornes[:-1]]) / largeur
+    moy_y = (somme_y[bornes[1:]] - somme_y[bornes[:-1]]) / largeur
+    # Point de référence à droite de chaque seau : moyenne du suivant, dernier point pour le dernier
+    cx = np.append(moy_x[1:], x[-1])
+    cy = np.append(moy_y[1:], y[-1])
+
+    indices = np.empty(points, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        d, f = bornes[i], bornes[i + 1]
+        xa, ya = x[a], y[a]
+        # Double de l'aire du triangle (A, B, C) pour chaque candidat B du seau
+        aires = np.abs((xa - cx[i]) * (y[d:f] - ya) - (xa - x[d:f]) * (cy[i] - ya))
+        a = d + int(aires.argmax())
+        indices[i + 1] = a
+    return indices
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+# Code postal -> station(s) météo la/les plus proche(s).
+# Index spatial : grille régulière (projection équirectangulaire en km) sur les
+# stations ; les k voisins de chaque centroïde de code postal sont précalculés une
+# fois. Les séries des stations (et leurs mélanges pondérés par inverse de la
+# distance) passent par un cache LRU : une flotte triée par région lit chaque
+# station une seule fois.
+import os
+import csv
+import math
+import functools
+import numpy as np
+
+from meteo_data import lire_meteo
+from stockage_meteo import est_stockage
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+STATIONS_DEMO = os.path.join(DATA_DIR, "stations_demo.csv")
+CODES_POSTAUX_DEMO = os.path.join(DATA_DIR, "codes_postaux_demo.csv")
+
+CELLULE_KM = 25.0      # pas de la grille spatiale
+K_VOISINS = 3          # voisins précalculés par code postal
+SERIES_EN_CACHE = 64   # séries (stations ou mélanges) gardées en mémoire
+RAYON_TERRE_KM = 6371.0
+
+def _lire_points(path, cle):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    ids = [r[cle].strip() for r in rows]
+    lat = np.array([float(r["lat"]) for r in rows])
+    lon = np.array([float(r["lon"]) for r in rows])
+    return ids, lat, lon
+
+def _projeter(lat, lon, lat0):
+    """Coordonnées planes approximatives (km), suffisantes à l'échelle d'un pays."""
+    return np.radians(lon) * RAYON_TERRE_KM * math.cos(math.radians(lat0)), np.radians(lat) * RAYON_TERRE_KM
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Distance orthodromique (haversine)."""
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(np.radians(lon2 - lon1) / 2) ** 2
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(a))
+
+def construire_grille(lat, lon, cellule_km: float = CELLULE_KM) -> dict:
+    lat0 = float(np.mean(lat)) if len(lat) else 46.5
+    x, y = _projeter(lat, lon, lat0)
+    cx, cy = np.floor(x / cellule_km).astype(int), np.floor(y / cellule_km).astype(int)
+    cellules = {}
+    for i, c in enumerate(zip(cx.tolist(), cy.tolist())):
+        cellules.setdefault(c, []).append(i)
+    return {"lat0": lat0, "cellule_km": cellule_km, "x": x, "y": y, "cellules": cellules,
+            "etendue": (cx.min(), cx.max(), cy.min(), cy.max()) if len(lat) else (0, 0, 0, 0)}
+
+def k_plus_proches(grille: dict, lat: float, lon: float, k: int):
+    """Indices des k stations les plus proches, par anneaux de cellules croissants."""
+    px, py = _projeter(lat, lon, grille["lat0"])
+    c = grille["cellule_km"]
+    cx, cy = int(math.floor(px / c)), int(math.floor(py / c))
+    x0, x1, y0, y1 = grille["etendue"]
+    r_max = max(abs(cx - x0), abs(cx - x1), abs(cy - y0), abs(cy - y1))
+    candidats = []
+    for r in range(r_max + 1):
+        for ix in range(cx - r, cx + r + 1):
+            for iy in (range(cy - r, cy + r + 1) if abs(ix - cx) == r else (cy - r, cy + r)):
+                candidats += grille["cellules"].get((ix, iy), [])
+        if len(candidats) >= k:
+            idx = np.array(candidats)
+            d = np.hypot(grille["x"][idx] - px, grille["y"][idx] - py)
+            ordre = np.argsort(d)[:k]
+            # Toute station hors des anneaux parcourus est à plus de r cellules
+            if d[ordre[-1]] <= r * c:
+                return idx[ordre]
+    idx = np.array(candidats, dtype=int)
+    d = np.hypot(grille["x"][idx] - px, grille["y"][idx] - py)
+    return idx[np.argsort(d)[:k]]
+
+def construire_index(path_stations: str = STATIONS_DEMO, path_codes_postaux: str = CODES_POSTAUX_DEMO,
+                     k: int = K_VOISINS) -> dict:
+    """
+    - path_stations : CSV station,lat,lon
+    - path_codes_postaux : CSV code_postal,lat,lon (centroïdes)
+    Précalcule les k stations les plus proches (et distances) de chaque code postal.
+    """
+    stations, s_lat, s_lon = _lire_points(path_stations, "station")
+    codes, c_lat, c_lon = _lire_points(path_codes_postaux, "code_postal")
+    grille = construire_grille(s_lat, s_lon)
+    k = min(k, len(stations))
+    voisins = np.array([k_plus_proches(grille, la, lo, k) for la, lo in zip(c_lat, c_lon)], dtype=int).reshape(len(codes), k)
+    return {
+        "stations": stations, "lat": s_lat, "lon": s_lon, "grille": grille,
+        "codes": {cp: i for i, cp in enumerate(codes)},
+        "voisins": voisins,
+        "distances_km": distance_km(c_lat[:, None], c_lon[:, None], s_lat[voisins], s_lon[voisins]),
+    }
+
+@functools.lru_cache(maxsize=8)
+def _index_cache(path_stations, path_codes_postaux, k, signature):
+    return construire_index(path_stations, path_codes_postaux, k)
+
+def charger_index(path_stations: str = STATIONS_DEMO, path_codes_postaux: str = CODES_POSTAUX_DEMO,
+                  k: int = K_VOISINS) -> dict:
+    """Index construit une fois, reconstruit si l'un des deux CSV change."""
+    signature = tuple(os.stat(p).st_mtime_ns for p in (path_stations, path_codes_postaux))
+    return _index_cache(os.path.abspath(path_stations), os.path.abspath(path_codes_postaux), k, signature)
+
+def stations_client(client: dict, index: dict, k: int = 1, puissance: float = 2.0):
+    """
+    Stations retenues pour un client et poids de mélange (inverse de la distance^puissance).
+    Le code postal est cherché dans l'index (construit pour au moins k voisins) ; à
+    défaut, client["lat"]/client["lon"].
+    Retourne une liste de (station, distance_km, poids).
+    """
+    k = max(1, min(k, len(index["stations"])))
+    cp = str(client.get("code_postal", "")).strip()
+    connu = cp in index["codes"]
+    if connu and k <= index["voisins"].shape[1]:
+        i = index["codes"][cp]
+        idx, d = index["voisins"][i, :k], index["distances_km"][i, :k]
+    elif "lat" in client and "lon" in client:
+        idx = k_plus_proches(index["grille"], float(client["lat"]), float(client["lon"]), k)
+        d = distance_km(float(client["lat"]), float(client["lon"]), index["lat"][idx], index["lon"][idx])
+    elif connu:
+        raise ValueError("Index météo construit pour {} voisins, {} demandés : charger_index(..., k={})".format(
+            index["voisins"].shape[1], k, k))
+    else:
+        raise KeyError("Code postal inconnu de l'index météo (et pas de lat/lon) : {}".format(cp))
+    if d[0] < 1.0:  # station quasi sur place : pas de mélange
+        idx, d = idx[:1], d[:1]
+    w = 1.0 / np.maximum(d, 1.0) ** puissance
+    w = w / w.sum()
+    return [(index["stations"][j], float(dj), float(wj)) for j, dj, wj in zip(idx, d, w)]
+
+@functools.lru_cache(maxsize=SERIES_EN_CACHE)
+def serie_station(source: str, station: str) -> dict:
+    """
+    Série d'une station en tableaux (lire_meteo ; partagée : ne pas modifier).
+    source : stockage binaire (stockage_meteo) ou dossier de CSV <station>.csv.
+    """
+    if est_stockage(source):
+        return lire_meteo(source, station)
+    return lire_meteo(os.path.join(source, station + ".csv"))
+
+@functools.lru_cache(maxsize=SERIES_EN_CACHE)
+def _serie_melangee(source: str, stations: tuple, poids: tuple) -> dict:
+    series = [serie_station(source, s) for s in stations]
+    dates = series[0]["datetime"]
+    for s in series[1:]:
+        if not np.array_equal(s["datetime"], dates):
+            dates = np.intersect1d(dates, s["datetime"])
+    t = sum(w * s["t_ext"][np.searchsorted(s["datetime"], dates)].astype(float) for s, w in zip(series, poids))
+    return {"datetime": dates, "t_ext": t}
+
+def meteo_client(client: dict, source: str, index: dict = None, k: int = 1, puissance: float = 2.0) -> dict:
+    """Météo locale du client : station la plus proche (k=1) ou mélange IDW des k plus proches."""
+    index = index or charger_index(k=max(K_VOISINS, k))
+    choix = stations_client(client, index, k, puissance)
+    if len(choix) == 1:
+        return serie_station(source, choix[0][0])
+    return _serie_melangee(source, tuple(s for s, _, _ in choix), tuple(round(w, 6) for _, _, w in choix))
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Stockage météo binaire en colonnes, lu par memory-map (sans copie).
+# Un répertoire contient :
+#   t_ext.f32   : températures float32 de toutes les stations, bout à bout
+#   epoch.i64   : horodatages int64 (secondes depuis 1970, triés par station)
+#   index.json  : {"stations": {id: {"debut": offset, "n": nombre d'heures}}}
+# Les pages sont partagées par le cache système entre processus (pool de workers).
+import os
+import json
+import numpy as np
+
+from cache_fichiers import charger_fichier
+
+FICHIER_T = "t_ext.f32"
+FICHIER_EPOCH = "epoch.i64"
+FICHIER_INDEX = "index.json"
+
+def est_stockage(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, FICHIER_INDEX))
+
+def _lire_index(path_index):
+    with open(path_index, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _ecrire_index(dossier: str, index: dict):
+    tmp = os.path.join(dossier, FICHIER_INDEX + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp, os.path.join(dossier, FICHIER_INDEX))
+
+def _ouvrir(path_index):
+    dossier = os.path.dirname(path_index)
+    index = _lire_index(path_index)
+    n = index["n_total"]
+    if n == 0:
+        t, e = np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+    else:
+        t = np.memmap(os.path.join(dossier, FICHIER_T), dtype=np.float32, mode="r", shape=(n,))
+        e = np.memmap(os.path.join(dossier, FICHIER_EPOCH), dtype=np.int64, mode="r", shape=(n,))
+    return {"stations": index["stations"], "t_ext": t, "epoch": e}
+
+def ouvrir_stockage(dossier: str) -> dict:
+    """Colonnes memory-mappées + index (rouvert seulement si index.json change)."""
+    return charger_fichier(os.path.join(dossier, FICHIER_INDEX), _ouvrir)
+
+def ajouter_station(dossier: str, station: str, epoch_s, t_ext):
+    """Ajoute une station (horodatages en secondes epoch, températures °C) en fin de stockage."""
+    os.makedirs(dossier, exist_ok=True)
+    path_index = os.path.join(dossier, FICHIER_INDEX)
+    index = _lire_index(path_index) if os.path.exists(path_index) else {"version": 1, "n_total": 0, "stations": {}}
+    if station in index["stations"]:
+        raise ValueError("Station déjà présente dans le stockage : {}".format(station))
+    epoch_s = np.asarray(epoch_s, dtype=np.int64)
+    ordre = np.argsort(epoch_s, kind="stable")
+    with open(os.path.join(dossier, FICHIER_T), "ab") as f:
+        np.asarray(t_ext, dtype=np.float32)[ordre].tofile(f)
+    with open(os.path.join(dossier, FICHIER_EPOCH), "ab") as f:
+        epoch_s[ordre].tofile(f)
+    index["stations"][station] = {"debut": index["n_total"], "n": int(len(epoch_s))}
+    index["n_total"] += int(len(epoch_s))
+    _ecrire_index(dossier, index)
+
+def convertir_csv(dossier: str, csv_par_station: dict):
+    """Ingestion de CSV (colonnes datetime, t_ext) : {station: chemin_csv}."""
+    from meteo_data import lire_meteo
+
+    for station, path_csv in csv_par_station.items():
+        m = lire_meteo(path_csv)
+        ajouter_station(dossier, station, m["datetime"].astype(np.int64), m["t_ext"])
+
+def lire_station(dossier: str, station: str = None, debut=None, fin=None):
+    """
+    Tranche [debut, fin) d'une station, sans copie : (dates datetime64[s], t_ext float32),
+    deux vues en lecture seule sur les fichiers mappés. Station par défaut : la seule du stockage.
+    """
+    s = ouvrir_stockage(dossier)
+    if station is None:
+        if len(s["stations"]) != 1:
+            raise ValueError("Plusieurs stations dans le stockage : préciser station")
+        station = next(iter(s["stations"]))
+    pos = s["stations"][station]
+    lo, hi = pos["debut"], pos["debut"] + pos["n"]
+    epoch = s["epoch"][lo:hi]
+    i = 0 if debut is None else int(np.searchsorted(epoch, np.datetime64(debut, "s").astype(np.int64)))
+    j = len(epoch) if fin is None else int(np.searchsorted(epoch, np.datetime64(fin, "s").astype(np.int64)))
+    return epoch[i:j].view("datetime64[s]"), s["t_ext"][lo + i:lo + j]
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Conversion de CSV météo vers le stockage binaire")
+    p.add_argument("dossier", help="répertoire du stockage (créé si besoin)")
+    p.add_argument("csv", nargs="+", help="STATION=chemin.csv (ou chemin.csv : station = nom du fichier)")
+    args = p.parse_args()
+    sources = {}
+    for item in args.csv:
+        station, _, path = item.rpartition("=")
+        sources[station or os.path.splitext(os.path.basename(path))[0]] = path
+    convertir_csv(args.dossier, sources)
+    print("✅ Stockage météo :", args.dossier, "—", ", ".join(sources))
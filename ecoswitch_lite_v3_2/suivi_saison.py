@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# Suivi de saison incrémental pour flux météo en direct.
+# Chaque appel à ajouter() ne traite que les nouvelles heures (O(nouvelles heures)) :
+# les agrégats reposent sur des sommes additives (noyau_calcul.sommes_scenarios) et
+# la médiane du COP sur une esquisse de quantiles à seaux logarithmiques (type
+# DDSketch), fusionnable. L'état se sauvegarde en JSON ; deux états couvrant des
+# périodes disjointes (shards par dates) se fusionnent.
+# L'hybride piloté n'est pas suivi : son planning optimise toute la série d'un coup
+# et ne se met pas à jour heure par heure. aggregats() n'a donc jamais les clés
+# CLES_PILOTE (verdict sans pilotage) ; pour ce scénario, simuler la saison complète.
+import os
+import json
+import math
+import numpy as np
+
+from meteo_data import tableaux_meteo
+from noyau_calcul import energie_utile_directe, sommes_scenarios, cumuler_sommes, agregats_depuis_sommes
+from modele_cop import cop_horaire
+from tarifs import grille_tarifaire, periodes_horaires, calendrier_client
+
+VERSION_ETAT = 1
+ALPHA = 0.001  # précision relative de l'esquisse (0,1 % sur le COP médian)
+
+# --- Esquisse de quantiles (seaux logarithmiques, comptes fusionnables) --------------
+
+def esquisse_vide(alpha: float = ALPHA) -> dict:
+    return {"alpha": alpha, "n": 0, "comptes": {}}
+
+def _gamma(esq):
+    return (1 + esq["alpha"]) / (1 - esq["alpha"])
+
+def esquisse_ajouter(esq: dict, valeurs):
+    """Ajoute des valeurs > 0 : seau i = ceil(log_gamma(x))."""
+    valeurs = np.asarray(valeurs, dtype=float)
+    valeurs = valeurs[valeurs > 0]
+    if not len(valeurs):
+        return esq
+    seaux, n = np.unique(np.ceil(np.log(valeurs) / math.log(_gamma(esq))).astype(int), return_counts=True)
+    c = esq["comptes"]
+    for i, k in zip(seaux.tolist(), n.tolist()):
+        c[i] = c.get(i, 0) + k
+    esq["n"] += int(len(valeurs))
+    return esq
+
+def esquisse_fusionner(a: dict, b: dict) -> dict:
+    if a["alpha"] != b["alpha"]:
+        raise ValueError("Esquisses de précisions différentes : {} / {}".format(a["alpha"], b["alpha"]))
+    c = dict(a["comptes"])
+    for i, k in b["comptes"].items():
+        c[i] = c.get(i, 0) + k
+    return {"alpha": a["alpha"], "n": a["n"] + b["n"], "comptes": c}
+
+def _valeur_rang(esq, rang):
+    g, cumul = _gamma(esq), 0
+    for i in sorted(esq["comptes"]):
+        cumul += esq["comptes"][i]
+        if cumul > rang:
+            return 2 * g ** i / (g + 1)
+
+def esquisse_mediane(esq: dict) -> float:
+    """Médiane (même convention que np.median sur un nombre pair) ; NaN si vide."""
+    n = esq["n"]
+    if n == 0:
+        return np.nan
+    return (_valeur_rang(esq, (n - 1) // 2) + _valeur_rang(esq, n // 2)) / 2
+
+# --- Suivi d'un client sur une saison -------------------------------------------------
+
+class SuiviSaison:
+    """
+    Totaux saison à date d'un client, mis à jour heure par heure :
+        suivi = SuiviSaison(client)
+        suivi.ajouter(meteo_du_jour)          # DataFrame datetime -> t_ext, ou lire_meteo
+        suivi.aggregats()                     # clés de simulate_chauffage hors pilotage
+        suivi.sauvegarder("saison.json")
+    Flux en ajout seul : les heures antérieures ou égales à la dernière reçue sont ignorées.
+    """
+
+    def __init__(self, client: dict, alpha: float = ALPHA):
+        self.client = dict(client)
+        self.sommes = {}
+        self.esquisse = esquisse_vide(alpha)
+        self.heures = 0
+        self.debut = None   # datetime64[s] de la première heure
+        self.fin = None     # datetime64[s] de la dernière heure
+
+    def ajouter(self, meteo) -> int:
+        """Intègre les nouvelles lignes météo ; retourne le nombre d'heures ajoutées."""
+        dates, t_ext = tableaux_meteo(meteo)
+        dates = np.asarray(dates).astype("datetime64[s]")
+        t_ext = np.asarray(t_ext, dtype=float)
+        if self.fin is not None:
+            neuf = dates > self.fin
+            dates, t_ext = dates[neuf], t_ext[neuf]
+        if not len(dates):
+            return 0
+        if np.any(np.diff(dates) <= np.timedelta64(0, "s")):
+            ordre = np.argsort(dates, kind="stable")
+            dates, t_ext = dates[ordre], t_ext[ordre]
+            garder = np.concatenate([[True], np.diff(dates) > np.timedelta64(0, "s")])
+            dates, t_ext = dates[garder], t_ext[garder]
+
+        c = self.client
+        e = energie_utile_directe(float(c["ua_w_k"]), float(c["t_confort"]), t_ext)
+        cop = cop_horaire(c, t_ext, float(c.get("t_depart_pac", 50)))
+        tarif = grille_tarifaire(c)
+        prix_elec = tarif["prix"][periodes_horaires(tarif, dates, calendrier_client(c))]
+        s = sommes_scenarios(e, cop, prix_elec, float(c["prix_gaz_eur_kwh"]), float(c["rendement_chaudiere"]))
+        self.sommes = cumuler_sommes(self.sommes, {k: float(v) for k, v in s.items()})
+        esquisse_ajouter(self.esquisse, cop[e > 0])
+        self.heures += len(dates)
+        self.debut = dates[0] if self.debut is None else self.debut
+        self.fin = dates[-1]
+        return len(dates)
+
+    def aggregats(self) -> dict:
+        if not self.sommes:
+            return {}
+        c = self.client
+        a = agregats_depuis_sommes(self.sommes, esquisse_mediane(self.esquisse),
+                                   float(c["prix_gaz_eur_kwh"]), float(c["rendement_chaudiere"]))
+        return {k: float(v) for k, v in a.items()}
+
+    def fusionner(self, autre: "SuiviSaison") -> "SuiviSaison":
+        """Nouveau suivi couvrant les deux périodes (disjointes, même client)."""
+        if autre.client != self.client:
+            raise ValueError("Fusion de suivis de clients différents")
+        if self.heures and autre.heures and not (self.fin < autre.debut or autre.fin < self.debut):
+            raise ValueError("Fusion de suivis dont les périodes se chevauchent")
+        res = SuiviSaison(self.client, self.esquisse["alpha"])
+        res.sommes = cumuler_sommes(self.sommes, autre.sommes) if autre.sommes else dict(self.sommes)
+        res.esquisse = esquisse_fusionner(self.esquisse, autre.esquisse)
+        res.heures = self.heures + autre.heures
+        bornes = [d for d in (self.debut, self.fin, autre.debut, autre.fin) if d is not None]
+        res.debut, res.fin = (min(bornes), max(bornes)) if bornes else (None, None)
+        return res
+
+    def etat(self) -> dict:
+        return {
+            "version": VERSION_ETAT,
+            "client": self.client,
+            "sommes": self.sommes,
+            "heures": self.heures,
+            "debut": None if self.debut is None else str(self.debut),
+            "fin": None if self.fin is None else str(self.fin),
+            "esquisse": dict(self.esquisse, comptes={str(i): k for i, k in self.esquisse["comptes"].items()}),
+        }
+
+    @classmethod
+    def depuis_etat(cls, etat: dict) -> "SuiviSaison":
+        if etat.get("version") != VERSION_ETAT:
+            raise ValueError("Version d'état de suivi non prise en charge : {}".format(etat.get("version")))
+        esq = etat["esquisse"]
+        s = cls(etat["client"], esq["alpha"])
+        s.sommes = dict(etat["sommes"])
+        s.heures = int(etat["heures"])
+        s.debut = None if etat["debut"] is None else np.datetime64(etat["debut"], "s")
+        s.fin = None if etat["fin"] is None else np.datetime64(etat["fin"], "s")
+        s.esquisse = {"alpha": esq["alpha"], "n": int(esq["n"]), "comptes": {int(i): int(k) for i, k in esq["comptes"].items()}}
+        return s
+
+    def sauvegarder(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.etat(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def charger(cls, path: str) -> "SuiviSaison":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.depuis_etat(json.load(f))
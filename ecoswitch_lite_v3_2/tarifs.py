@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# Tarifs électricité compilés : chaque heure est rattachée à une période
+# tarifaire (base, HP/HC, couleur Tempo × HP/HC) puis tarifée par une
+# simple indexation NumPy. Les JSON ne sont lus qu'une fois (cache mtime).
+import os
+import csv
+import json
+import numpy as np
+
+from cache_fichiers import charger_fichier
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+TARIFS_HP_HC = os.path.join(DATA_DIR, "tarifs_hp_hc.json")
+TARIFS_TEMPO = os.path.join(DATA_DIR, "tarifs_tempo.json")
+
+COULEURS_TEMPO = ("bleu", "blanc", "rouge")
+
+def _masque_hc(heures_creuses):
+    hc = np.zeros(24, dtype=bool)
+    hc[np.asarray(heures_creuses, dtype=int) % 24] = True
+    return hc
+
+def _compiler_hp_hc(path):
+    with open(path, "r", encoding="utf-8") as f:
+        t = json.load(f)
+    return {
+        "mode": "hp_hc",
+        "periodes": ("hp", "hc"),
+        "prix": np.array([t["hp_eur_kwh"], t["hc_eur_kwh"]], dtype=float),
+        "heure_creuse": _masque_hc(t["heures_creuses"]),
+    }
+
+def _compiler_tempo(path):
+    with open(path, "r", encoding="utf-8") as f:
+        t = json.load(f)
+    # Période = 2 * couleur + (1 si heure creuse) -> bleu_hp, bleu_hc, blanc_hp, ...
+    periodes, prix = [], []
+    for c in COULEURS_TEMPO:
+        periodes += [c + "_hp", c + "_hc"]
+        prix += [t[c]["hp"], t[c]["hc"]]
+    return {
+        "mode": "tempo",
+        "periodes": tuple(periodes),
+        "prix": np.array(prix, dtype=float),
+        "heure_creuse": _masque_hc(t["heures_creuses"]),
+        "couleur_defaut": COULEURS_TEMPO.index(t.get("default_couleur", "bleu")),
+        # Le jour Tempo commence à 6h chez EDF ; 0 = jour calendaire.
+        "heure_debut_jour": int(t.get("heure_debut_jour", 0)),
+    }
+
+def charger_hp_hc(json_path: str = TARIFS_HP_HC) -> dict:
+    return charger_fichier(json_path, _compiler_hp_hc)
+
+def charger_tempo(json_path: str = TARIFS_TEMPO) -> dict:
+    return charger_fichier(json_path, _compiler_tempo)
+
+# ------------------ Calendrier Tempo ------------------
+
+def _compiler_calendrier(jours_couleurs) -> dict:
+    """{date ISO: couleur} -> tableaux triés (jours datetime64[D], codes couleur)."""
+    if not jours_couleurs:
+        return {"jours": np.array([], dtype="datetime64[D]"), "couleurs": np.array([], dtype=np.int8)}
+    items = sorted((np.datetime64(str(j)[:10], "D"), c) for j, c in jours_couleurs.items())
+    try:
+        codes = [COULEURS_TEMPO.index(str(c).strip().lower()) for _, c in items]
+    except ValueError:
+        raise ValueError("Couleur Tempo inconnue (attendu : bleu, blanc, rouge)")
+    return {
+        "jours": np.array([j for j, _ in items], dtype="datetime64[D]"),
+        "couleurs": np.array(codes, dtype=np.int8),
+    }
+
+def _lire_calendrier(path):
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            jours = {row["date"]: row["couleur"] for row in csv.DictReader(f)}
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            jours = json.load(f)
+        jours = jours.get("jours", jours)
+    return _compiler_calendrier(jours)
+
+def charger_calendrier_tempo(source) -> dict:
+    """
+    Calendrier Tempo jour par jour.
+    - source : chemin JSON ({"AAAA-MM-JJ": "rouge", ...}) ou CSV (colonnes date,couleur),
+      ou directement un dict {date: couleur}.
+    Les jours absents prennent la couleur par défaut du tarif.
+    """
+    if isinstance(source, dict):
+        return _compiler_calendrier(source)
+    return charger_fichier(source, _lire_calendrier)
+
+# ------------------ Indexation horaire ------------------
+
+def _heures(dates):
+    d = np.asarray(dates, dtype="datetime64[h]")
+    return (d - d.astype("datetime64[D]")).astype(np.int64)
+
+def couleurs_tempo(dates, calendrier=None, tarif=None) -> np.ndarray:
+    """Code couleur (0 bleu, 1 blanc, 2 rouge) de chaque horodatage."""
+    tarif = tarif or charger_tempo()
+    d = np.asarray(dates, dtype="datetime64[h]")
+    jours = (d - np.timedelta64(tarif["heure_debut_jour"], "h")).astype("datetime64[D]")
+    out = np.full(jours.shape, tarif["couleur_defaut"], dtype=np.int8)
+    if calendrier is None or len(calendrier["jours"]) == 0:
+        return out
+    cal_j, cal_c = calendrier["jours"], calendrier["couleurs"]
+    pos = np.searchsorted(cal_j, jours).clip(0, len(cal_j) - 1)
+    connu = cal_j[pos] == jours
+    out[connu] = cal_c[pos[connu]]
+    return out
+
+def grille_tarifaire(client: dict) -> dict:
+    """Tarif compilé du client (le mode base prend son prix dans le dict client)."""
+    mode = client.get("mode_tarif", "base")
+    if mode == "hp_hc":
+        return charger_hp_hc()
+    if mode == "tempo":
+        return charger_tempo()
+    return {
+        "mode": "base",
+        "periodes": ("base",),
+        "prix": np.array([float(client["prix_elec_eur_kwh"])], dtype=float),
+        "heure_creuse": np.zeros(24, dtype=bool),
+    }
+
+def periodes_horaires(tarif: dict, dates, calendrier=None) -> np.ndarray:
+    """Indice de période tarifaire (dans tarif["periodes"]) pour chaque heure."""
+    n = len(dates)
+    if tarif["mode"] == "base":
+        return np.zeros(n, dtype=np.int8)
+    hc = tarif["heure_creuse"][_heures(dates)].astype(np.int8)
+    if tarif["mode"] == "hp_hc":
+        return hc
+    return 2 * couleurs_tempo(dates, calendrier, tarif) + hc
+
+def calendrier_client(client: dict):
+    source = client.get("calendrier_tempo")
+    return charger_calendrier_tempo(source) if source else None
+
+def prix_elec_horaire(client: dict, dates) -> np.ndarray:
+    """Vecteur de prix élec (€/kWh) aligné sur dates, en une seule indexation."""
+    tarif = grille_tarifaire(client)
+    codes = periodes_horaires(tarif, dates, calendrier_client(client))
+    return tarif["prix"][codes]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Portefeuille en DataFrame : mêmes résultats que le chemin JSONL (python -m pytest tests)
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+RACINE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(RACINE))
+
+from client_data import load_clients
+from meteo_data import lire_meteo
+from flotte import lister_clients, simuler_flotte
+
+def _clients_mixtes() -> list:
+    """Clients démo + champs optionnels présents pour certains seulement."""
+    clients = load_clients(str(RACINE / "data" / "clients_demo.jsonl"))
+    clients[0]["capacite_thermique_kwh_k"] = 8.0                 # seul client piloté
+    sans_depart = {k: v for k, v in clients[1].items() if k != "t_depart_pac"}
+    clients.append(dict(sans_depart, id="C999"))                 # t_depart_pac par défaut
+    return clients
+
+def test_dataframe_cellules_vides_absentes():
+    clients = _clients_mixtes()
+    lignes = lister_clients(pd.DataFrame(clients))
+    assert lignes == clients
+
+def test_dataframe_comme_jsonl(monkeypatch):
+    monkeypatch.chdir(RACINE)  # chemins relatifs des calendriers et modèles de PAC
+    clients = _clients_mixtes()
+    meteo = lire_meteo("data/meteo_demo.csv")
+    attendu = simuler_flotte(clients, meteo)
+    obtenu = simuler_flotte(pd.DataFrame(clients), meteo)
+    assert obtenu == attendu
+    assert "cout_pilote_eur" in obtenu[0] and "cout_pilote_eur" not in obtenu[1]
+    assert all(pd.notna(l["cout_pac_eur"]) for l in obtenu)
@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
 # EcoSwitch Lite V3.2 — UI (Nest/Tesla/Starlink-inspired) — Safe for Python 3.13
 
-import os, sys, pathlib, io
+import os, sys, pathlib, json
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
 import streamlit as st
 
 # Make root modules importable
@@ -12,14 +12,23 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 from .brand import BRAND
-from client_data import load_client
-from meteo_data import load_meteo
-from simulateur import simulate_chauffage
+from .calculs import (client_initial, resultats_client, colonnes_horaires, cle_physique, carte_verdicts, plage_axe, PLAGES_BALAYAGE,
+                      export_horaires, couts_cumules, courbes_couts, SERIES_COUTS)
 from verdict_engine import recommander_solution
 from eco_score import calculer_ecoscore
+from instrumentation import span, demarrer, arreter
+from rapport_client import FORMATS, TYPES_MIME, formats_disponibles, rendre_rapport
 
 st.set_page_config(page_title="EcoSwitch Lite V3.2", page_icon="🌿", layout="wide")
 
+# Profilage opt-in (panneau « Débogage » en bas de page) : mesure l'exécution suivante
+# (session de mesure propre à ce navigateur : gardée dans st.session_state)
+PROFILAGE = st.session_state.get("profilage", False)
+if st.session_state.get("_mesure") is not None:  # exécution précédente interrompue
+    arreter(session=st.session_state.pop("_mesure"))
+if PROFILAGE:
+    st.session_state["_mesure"] = demarrer(memoire=True, cprofile=st.session_state.get("profilage_cprofile", False))
+
 C = BRAND["colors"]
 F = BRAND["fonts"]
 
@@ -100,7 +109,7 @@ st.markdown(_css, unsafe_allow_html=True)
 # ------------------ Sidebar controls ------------------
 with st.sidebar:
     st.markdown("### ⚙️ Paramètres")
-    client = load_client(str(ROOT / "demo_client.json"))
+    client = client_initial(str(ROOT / "demo_client.json"))
     mode_list = ["base", "hp_hc", "tempo"]
     mode_idx = mode_list.index(client.get("mode_tarif", "base")) if client.get("mode_tarif", "base") in mode_list else 0
     mode = st.selectbox("Mode tarif", mode_list, index=mode_idx)
@@ -114,15 +123,25 @@ with st.sidebar:
     client["ua_w_k"] = int(st.slider("UA (W/K)", min_value=80, max_value=450, value=int(client["ua_w_k"]), step=5))
     client["t_confort"] = float(st.slider("T° confort (°C)", min_value=16.0, max_value=22.0, value=float(client["t_confort"]), step=0.5))
     client["t_depart_pac"] = int(st.slider("T° départ PAC (°C)", min_value=35, max_value=60, value=int(client["t_depart_pac"]), step=1))
+    inertie = st.number_input("Inertie thermique (kWh/K, 0 = sans pilotage)", min_value=0.0, max_value=100.0,
+                              value=float(client.get("capacite_thermique_kwh_k") or 0.0), step=1.0)
+    if inertie > 0:
+        client["capacite_thermique_kwh_k"] = inertie
+    else:
+        client.pop("capacite_thermique_kwh_k", None)
 
-# ------------------ Load meteo & simulate ------------------
-meteo = load_meteo(str(ROOT / "data" / "meteo_demo.csv"))
-res = simulate_chauffage(client, meteo)
-verdict = recommander_solution(res, client)
-score = calculer_ecoscore(res)
+# ------------------ Load meteo & simulate (cached) ------------------
+# Physique (besoin, COP) mémorisée par paramètres ; un changement de prix ne fait
+# que réévaluer le registre énergétique.
+METEO_PATH = str(ROOT / "data" / "meteo_demo.csv")
+with span("simulation"):
+    res = resultats_client(client, METEO_PATH)
+with span("verdict"):
+    verdict = recommander_solution(res, client)
+with span("ecoscore"):
+    score = calculer_ecoscore(res)
 
 a = res["aggregats"]
-df = res["horaires"]
 
 # ------------------ Hero ------------------
 st.markdown(
@@ -137,7 +156,7 @@ col1, col2, col3, col4 = st.columns([1.2, 1, 1, 1])
 # Verdict/LED
 if verdict.startswith("🟢"):
     LED_COLOR = C["accent"]
-elif verdict.startswith("🔵"):
+elif verdict.startswith(("🔵", "🟣")):
     LED_COLOR = C["accentAlt"]
 else:
     LED_COLOR = C["warn"]
@@ -174,51 +193,81 @@ with col4:
 st.write("")
 
 # ------------------ Plot: Coûts cumulés ------------------
-plot_df = df.reset_index()[["datetime","Cout_pac_eur","Cout_gaz_eur"]].rename(columns={
-    "datetime":"Date/Heure", "Cout_pac_eur":"PAC (€)", "Cout_gaz_eur":"Gaz (€)"
-})
-fig = px.line(plot_df, x="Date/Heure", y=["PAC (€)", "Gaz (€)"], title="Coûts cumulés — PAC vs Gaz (période simulée)")
+# Cumuls calculés côté serveur, réduits (LTTB) à un nombre fixe de points par série ;
+# la plage choisie est recalculée à une résolution plus fine.
+with span("couts_cumules"):
+    prix_courants = (float(client["prix_elec_eur_kwh"]), float(client["prix_gaz_eur_kwh"]))
+    dates_sim = couts_cumules(cle_physique(client), prix_courants, METEO_PATH)["dates"]
+    d0, d1 = pd.Timestamp(dates_sim[0]).to_pydatetime(), pd.Timestamp(dates_sim[-1]).to_pydatetime()
+    plage = st.slider("Période affichée", min_value=d0, max_value=d1, value=(d0, d1),
+                      step=pd.Timedelta(hours=1).to_pytimedelta(), format="DD/MM/YYYY HH:mm", key="plage_couts")
+    courbes = courbes_couts(cle_physique(client), prix_courants, METEO_PATH, *plage)
+fig = go.Figure([go.Scatter(x=x, y=y, mode="lines", name=SERIES_COUTS[k]) for k, (x, y) in courbes["series"].items()])
 fig.update_layout(
+    title="Coûts cumulés — PAC, Gaz, Hybride (période simulée)",
     paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
-    font_color=C["text"], title_font_size=18, legend_title_text=""
+    font_color=C["text"], title_font_size=18, legend_title_text="",
+    xaxis_title="Date/Heure", yaxis_title="€ cumulés"
 )
 st.plotly_chart(fig, use_container_width=True)
+st.caption("{} heures affichées en {} points par série".format(
+    courbes["heures"], len(next(iter(courbes["series"].values()))[0])))
+
+# ------------------ What-if: carte des verdicts ------------------
+with st.expander("🗺️ Carte des verdicts (what-if)"), span("carte_verdicts"):
+    axes = list(PLAGES_BALAYAGE)
+    cx, cy = st.columns(2)
+    axe_x = cx.selectbox("Axe horizontal", axes, index=axes.index("ua_w_k"), format_func=lambda k: plage_axe(k, mode)[0])
+    axe_y = cy.selectbox("Axe vertical", [k for k in axes if k != axe_x], index=2, format_func=lambda k: plage_axe(k, mode)[0])
+    carte = carte_verdicts(cle_physique(client), (float(client["prix_elec_eur_kwh"]), float(client["prix_gaz_eur_kwh"])),
+                           METEO_PATH, axe_x, axe_y)
+    couleurs = [C["accent"], C["accentAlt"], C["warn"]]
+    fig_map = go.Figure(go.Heatmap(
+        x=carte["x"], y=carte["y"], z=carte["verdict"], zmin=0, zmax=2, showscale=False,
+        colorscale=[[0.0, couleurs[0]], [0.33, couleurs[0]], [0.33, couleurs[1]], [0.66, couleurs[1]], [0.66, couleurs[2]], [1.0, couleurs[2]]],
+        customdata=carte["ecoscore"],
+        hovertemplate="x=%{x:.3g}<br>y=%{y:.3g}<br>EcoScore %{customdata}/100<extra></extra>",
+    ))
+    fx, fy = carte["frontiere"]
+    fig_map.add_trace(go.Scatter(x=fx, y=fy, mode="markers", marker=dict(size=3, color=C["white"]),
+                                 name="Bascule du verdict", hoverinfo="skip"))
+    pos = {"prix_elec": 1.0 if mode in ("hp_hc", "tempo") else client["prix_elec_eur_kwh"], "prix_gaz": client["prix_gaz_eur_kwh"]}
+    pos.update({k: client[k] for k in ("ua_w_k", "t_confort", "t_depart_pac")})
+    fig_map.add_trace(go.Scatter(x=[pos[axe_x]], y=[pos[axe_y]], mode="markers", name="Client",
+                                 marker=dict(size=12, symbol="x", color=C["text"])))
+    fig_map.update_layout(
+        paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color=C["text"],
+        xaxis_title=plage_axe(axe_x, mode)[0], yaxis_title=plage_axe(axe_y, mode)[0], showlegend=False,
+        title="Verdict selon les paramètres (🟢 PAC · 🔵 hybride · 🟠 chaudière)", title_font_size=16,
+    )
+    st.plotly_chart(fig_map, use_container_width=True)
 
-# ------------------ Downloads (in-memory) ------------------
-report = io.StringIO()
-report.write("EcoSwitch Lite V3.2 — Rapport client\n")
-report.write("=====================================\n\n")
-report.write("Client : {} — CP {}\n".format(client.get('nom','N/A'), client.get('code_postal','')))
-report.write("UA : {} W/K | T_confort : {} °C\n".format(client.get('ua_w_k'), client.get('t_confort')))
-report.write("Rendement chaudière : {} | Mode tarif : {}\n".format(client.get('rendement_chaudiere'), client.get('mode_tarif')))
-report.write("T_depart PAC : {} °C\n\n".format(client.get('t_depart_pac')))
-report.write("Synthèse énergétique & économique\n")
-report.write("---------------------------------\n")
-report.write("Énergie utile demandée : {:.1f} kWh\n".format(a['energie_utile_kWh']))
-report.write("COP médian observé    : {:.2f}\n\n".format(a['cop_median']))
-report.write("Scénarios comparés (totaux)\n")
-report.write("---------------------------\n")
-report.write("Gaz seul  : coût = {:.2f} €, CO₂ = {:.1f} kg\n".format(a['cout_gaz_eur'], a['co2_gaz_kg']))
-report.write("PAC seule : coût = {:.2f} €, CO₂ = {:.1f} kg\n".format(a['cout_pac_eur'], a['co2_pac_kg']))
-report.write("Hybride   : coût = {:.2f} €, CO₂ = {:.1f} kg\n".format(a['cout_hybride_eur'], a['co2_hybride_kg']))
-report.write("Part utile PAC en hybride : {:.1f} %\n\n".format(a['part_utile_pac_hybride_%']))
-report.write("Recommandation\n")
-report.write("--------------\n")
-report.write("{}\n\n".format(verdict))
-report.write("EcoScore (0–100)\n")
-report.write("----------------\n")
-report.write("{}/100\n\n".format(score))
-report.write("Notes\n")
-report.write("-----\n")
-report.write("- Modèle Lite pédagogique. Pour une étude détaillée : EcoSwitch Core v10.2.\n")
-report.write("- Hypothèses CO₂ et tarifs simplifiées. Données 100% locales, sans cloud.\n")
-report.write("- « Ne devinez plus — mesurez. »\n")
-report_bytes = report.getvalue().encode("utf-8")
-
-csv_buf = io.StringIO()
-df.reset_index().to_csv(csv_buf, index=False)
-csv_bytes = csv_buf.getvalue().encode("utf-8")
-
-st.download_button("📄 Télécharger le rapport client", data=report_bytes, file_name="rapport_client.txt", mime="text/plain")
-st.download_button("🧾 Télécharger les résultats horaires (CSV)", data=csv_bytes, file_name="resultats_horaires.csv", mime="text/csv")
+# ------------------ Downloads (in-memory, built on click) ------------------
+# Rapport et exports du module rapport_client (mêmes sorties que la CLI)
+st.download_button("📄 Télécharger le rapport client", data=lambda: rendre_rapport(client, a, verdict, score).encode("utf-8"),
+                   file_name="rapport_client.txt", mime="text/plain")
+with st.expander("🧾 Exporter les résultats horaires"):
+    ce1, ce2 = st.columns([1, 3])
+    fmt_export = ce1.selectbox("Format", formats_disponibles(), key="format_export")
+    colonnes_export = ce2.multiselect("Colonnes (toutes si vide)", colonnes_horaires(res["pilote"]), key="colonnes_export")
+    prix_client = (float(client["prix_elec_eur_kwh"]), float(client["prix_gaz_eur_kwh"]))
+    st.download_button("⬇️ Télécharger ({})".format(fmt_export),
+                       data=lambda: export_horaires(cle_physique(client), prix_client, METEO_PATH, fmt_export,
+                                                    tuple(colonnes_export)),
+                       file_name="resultats_horaires" + FORMATS[fmt_export], mime=TYPES_MIME[fmt_export])
 st.markdown('<a class="es-cta" href="#" onclick="window.location.reload();return false;">🔄 Actualiser l\'affichage</a>', unsafe_allow_html=True)
+
+# ------------------ Débogage : profil d'exécution ------------------
+mesures = arreter(session=st.session_state.pop("_mesure")) if PROFILAGE else None
+with st.expander("🛠️ Débogage — profil d'exécution"):
+    st.checkbox("Profiler les exécutions (temps et allocations par étape)", key="profilage")
+    st.checkbox("Inclure cProfile (plus lent)", key="profilage_cprofile")
+    if mesures is None:
+        st.caption("Activer le profilage : l'exécution suivante est mesurée (simulation en cache = quasi instantanée).")
+    else:
+        st.caption("Durée totale du script : {:.1f} ms".format(mesures["duree_totale_ms"]))
+        st.dataframe([dict(etape=k, **v) for k, v in mesures["resume"].items()], use_container_width=True)
+        if "cprofile" in mesures:
+            st.dataframe(mesures["cprofile"], use_container_width=True)
+        st.download_button("⏱️ Télécharger le profil (JSON)", data=json.dumps(mesures, indent=1, ensure_ascii=False),
+                           file_name="profil.json", mime="application/json")
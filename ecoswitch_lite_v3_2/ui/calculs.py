@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+# Couche de cache de l'UI : la physique (besoin, COP, périodes tarifaires) est
+# mémorisée par hash des paramètres ; les prix ne déclenchent qu'une réévaluation
+# du registre énergétique et des colonnes de coût.
+import json
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from client_data import load_client
+from meteo_data import load_meteo
+from simulateur import simulate_chauffage
+from tarifs import grille_tarifaire, periodes_horaires, calendrier_client
+from registre_energie import reevaluer
+from noyau_calcul import scenarios
+from pilotage import scenario_pilote
+from balayage import balayer, coupe_2d, points_frontiere
+from rapport_client import horaires_en_octets
+from sous_echantillonnage import lttb, POINTS_MAX
+
+# Simulations physiques gardées en mémoire (éviction des plus anciennes au-delà)
+MAX_SIMULATIONS = 32
+
+# Champs client qui n'influencent que les coûts
+CHAMPS_PRIX = ("prix_elec_eur_kwh", "prix_gaz_eur_kwh")
+
+# Colonnes horaires indépendantes des prix (gardées par simulation_physique)
+COLONNES_PHYSIQUE = ("T_ext", "dT", "E_utile_kWh", "COP")
+
+# Séries du graphique des coûts cumulés : colonne horaire -> libellé
+SERIES_COUTS = {"Cout_pac_eur": "PAC (€)", "Cout_gaz_eur": "Gaz (€)", "Cout_hybride_eur": "Hybride (€)"}
+
+@st.cache_resource(show_spinner=False)
+def meteo_partagee(path_csv: str) -> pd.DataFrame:
+    """Météo chargée une fois par processus (partagée entre sessions, ne pas modifier)."""
+    return load_meteo(path_csv)
+
+@st.cache_data(show_spinner=False)
+def client_initial(path_json: str) -> dict:
+    """Client de départ (copie fraîche à chaque appel : l'UI le modifie)."""
+    return load_client(path_json)
+
+def cle_physique(client: dict) -> str:
+    """Paramètres du client hors prix, sérialisés de façon stable (clé de cache)."""
+    return json.dumps({k: v for k, v in client.items() if k not in CHAMPS_PRIX}, sort_keys=True)
+
+@st.cache_data(max_entries=MAX_SIMULATIONS, show_spinner=False)
+def simulation_physique(cle: str, path_meteo: str) -> dict:
+    """
+    Partie indépendante des prix de simulate_chauffage : colonnes T_ext/dT/E_utile/COP,
+    période tarifaire de chaque heure et registre énergétique.
+    """
+    client = json.loads(cle)
+    client.update({k: 1.0 for k in CHAMPS_PRIX})  # prix fictifs : seuls les volumes sont gardés
+    client.pop("capacite_thermique_kwh_k", None)  # planning piloté : calculé aux prix courants
+    meteo = meteo_partagee(path_meteo)
+    res = simulate_chauffage(client, meteo)
+    tarif = grille_tarifaire(client)
+    return {
+        "physique": res["horaires"][list(COLONNES_PHYSIQUE)],
+        "codes": periodes_horaires(tarif, meteo.index.values, calendrier_client(client)),
+        "prix_periodes": tarif["prix"],
+        "registre": res["registre"],
+    }
+
+def _prix_periodes(client: dict, sim: dict):
+    if client.get("mode_tarif", "base") in ("hp_hc", "tempo"):
+        return sim["prix_periodes"]
+    return [float(client["prix_elec_eur_kwh"])]
+
+@st.cache_data(max_entries=MAX_SIMULATIONS, show_spinner=False)
+def pilote_client(cle: str, prix: tuple, path_meteo: str):
+    """
+    Hybride piloté (pilotage.scenario_pilote) : le planning dépend des prix, il est
+    recalculé sur la physique en cache une fois par paramètres/prix. None si non piloté.
+    """
+    client = json.loads(cle)
+    client["prix_elec_eur_kwh"], client["prix_gaz_eur_kwh"] = prix
+    sim = simulation_physique(cle, path_meteo)
+    return scenario_pilote(client, sim["physique"]["T_ext"].to_numpy(dtype=float), sim["physique"]["COP"].to_numpy(),
+                           np.asarray(_prix_periodes(client, sim), dtype=float)[sim["codes"]])
+
+def resultats_client(client: dict, path_meteo: str) -> dict:
+    """Équivalent de simulate_chauffage, la physique venant du cache (clés "simulation", "pilote")."""
+    cle = cle_physique(client)
+    sim = simulation_physique(cle, path_meteo)
+    aggregats = reevaluer(sim["registre"], _prix_periodes(client, sim), float(client["prix_gaz_eur_kwh"]))
+    pilote = pilote_client(cle, (float(client["prix_elec_eur_kwh"]), float(client["prix_gaz_eur_kwh"])), path_meteo)
+    if pilote is not None:
+        aggregats.update(pilote["aggregats"])
+    return {
+        "aggregats": aggregats,
+        "registre": sim["registre"],
+        "simulation": sim,
+        "pilote": pilote,
+    }
+
+def horaires(client: dict, sim: dict, pilote: dict = None) -> pd.DataFrame:
+    """
+    Séries horaires complètes aux prix courants, mêmes colonnes que simuler_tableaux
+    (dont celles de l'hybride piloté si pilote, résultat de pilote_client).
+    """
+    prix_gaz = float(client["prix_gaz_eur_kwh"])
+    df = sim["physique"].copy()
+    df["prix_elec"] = np.asarray(_prix_periodes(client, sim), dtype=float)[sim["codes"]]
+    df["prix_gaz"] = prix_gaz
+    colonnes = scenarios(df["E_utile_kWh"].to_numpy(), df["COP"].to_numpy(), df["prix_elec"].to_numpy(),
+                         prix_gaz, float(client["rendement_chaudiere"]))
+    if pilote is not None:
+        colonnes.update(pilote["horaires"])
+    for nom, valeurs in colonnes.items():
+        df[nom] = valeurs
+    return df
+
+@st.cache_data(show_spinner=False)
+def _colonnes_scenarios() -> list:
+    un = np.ones(1)
+    return list(scenarios(un, un, un, 1.0, 1.0))
+
+def colonnes_horaires(pilote: dict = None) -> list:
+    """Colonnes de horaires() (choix de l'export) sans construire les séries."""
+    return (list(COLONNES_PHYSIQUE) + ["prix_elec", "prix_gaz"] + _colonnes_scenarios()
+            + (list(pilote["horaires"]) if pilote is not None else []))
+
+@st.cache_data(max_entries=MAX_SIMULATIONS, show_spinner=False)
+def export_horaires(cle: str, prix: tuple, path_meteo: str, fmt: str, colonnes: tuple = None) -> bytes:
+    """Séries horaires exportées (rapport_client), sérialisées une fois par paramètres/prix/format."""
+    client = json.loads(cle)
+    client["prix_elec_eur_kwh"], client["prix_gaz_eur_kwh"] = prix
+    df = horaires(client, simulation_physique(cle, path_meteo), pilote_client(cle, prix, path_meteo))
+    return horaires_en_octets(df, fmt, list(colonnes) if colonnes else None)
+
+@st.cache_data(max_entries=MAX_SIMULATIONS, show_spinner=False)
+def couts_cumules(cle: str, prix: tuple, path_meteo: str) -> dict:
+    """Coûts cumulés (€) des 3 scénarios sur toute la période : {"dates", colonne: cumul}."""
+    client = json.loads(cle)
+    client["prix_elec_eur_kwh"], client["prix_gaz_eur_kwh"] = prix
+    sim = simulation_physique(cle, path_meteo)
+    physique = sim["physique"]
+    prix_elec = np.asarray(_prix_periodes(client, sim), dtype=float)[sim["codes"]]
+    colonnes = scenarios(physique["E_utile_kWh"].to_numpy(), physique["COP"].to_numpy(), prix_elec,
+                         float(client["prix_gaz_eur_kwh"]), float(client["rendement_chaudiere"]))
+    cumuls = np.cumsum(np.vstack([colonnes[k] for k in SERIES_COUTS]), axis=1)
+    return {"dates": physique.index.values, **dict(zip(SERIES_COUTS, cumuls))}
+
+@st.cache_data(max_entries=4 * MAX_SIMULATIONS, show_spinner=False)
+def courbes_couts(cle: str, prix: tuple, path_meteo: str, debut, fin, points: int = POINTS_MAX) -> dict:
+    """
+    Coûts cumulés sur [debut, fin] réduits par LTTB à `points` points par série :
+    charge du graphique constante quelle que soit la période ; une plage plus
+    courte est recalculée à une résolution plus fine.
+    """
+    cumuls = couts_cumules(cle, prix, path_meteo)
+    dates = cumuls["dates"]
+    i0 = np.searchsorted(dates, np.datetime64(debut))
+    i1 = np.searchsorted(dates, np.datetime64(fin), side="right")
+    series = {}
+    for k in SERIES_COUTS:
+        idx = lttb(dates[i0:i1], cumuls[k][i0:i1], points)
+        series[k] = (dates[i0:i1][idx], cumuls[k][i0:i1][idx])
+    return {"series": series, "heures": int(i1 - i0)}
+
+# Axes proposés pour la carte des verdicts : libellé, min, max
+PLAGES_BALAYAGE = {
+    "ua_w_k": ("UA (W/K)", 80.0, 450.0),
+    "t_confort": ("T° confort (°C)", 16.0, 22.0),
+    "t_depart_pac": ("T° départ PAC (°C)", 35.0, 60.0),
+    "prix_elec": ("Prix élec (€/kWh)", 0.05, 0.60),
+    "prix_gaz": ("Prix gaz (€/kWh)", 0.04, 0.25),
+}
+# Hors tarif base, l'axe prix élec est un facteur sur la grille HP/HC ou Tempo
+PLAGE_FACTEUR_ELEC = ("Facteur prix élec (×)", 0.5, 2.0)
+
+def plage_axe(axe: str, mode_tarif: str):
+    if axe == "prix_elec" and mode_tarif in ("hp_hc", "tempo"):
+        return PLAGE_FACTEUR_ELEC
+    return PLAGES_BALAYAGE[axe]
+
+@st.cache_data(max_entries=MAX_SIMULATIONS, show_spinner=False)
+def carte_verdicts(cle: str, prix: tuple, path_meteo: str, axe_x: str, axe_y: str, n: int = 40) -> dict:
+    """Coupe 2-D du balayage what-if autour du client (autres paramètres fixés)."""
+    client = json.loads(cle)
+    client["prix_elec_eur_kwh"], client["prix_gaz_eur_kwh"] = prix
+    mode = client.get("mode_tarif", "base")
+    axes = {a: np.linspace(*plage_axe(a, mode)[1:], n) for a in (axe_x, axe_y)}
+    res = balayer(client, meteo_partagee(path_meteo), **axes)
+    return {
+        "x": res["axes"][axe_x], "y": res["axes"][axe_y],
+        "verdict": coupe_2d(res, axe_x, axe_y),
+        "ecoscore": coupe_2d(res, axe_x, axe_y, "ecoscore"),
+        "frontiere": points_frontiere(res, axe_x, axe_y),
+    }
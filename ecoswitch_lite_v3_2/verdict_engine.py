@@ -1,16 +1,39 @@
 # -*- coding: utf-8 -*-
-def recommander_solution(resultats: dict, client: dict) -> str:
-    a = resultats["aggregats"]
+import numpy as np
+
+VERDICTS = (
+    "🟢 PAC seule recommandée (économique et performante)",
+    "🔵 PAC hybride (en relève) recommandée",
+    "🟠 Conserver la chaudière (optimiser les réglages d’abord)",
+    "🟣 PAC hybride pilotée (préchauffage en heures bon marché) recommandée",
+)
+
+# Verdicts atteignables sans scénario piloté (codes_verdict appelé sans cout_pilote)
+VERDICTS_SANS_PILOTAGE = VERDICTS[:3]
 
-    cout_pac = a["cout_pac_eur"]
-    cout_gaz = a["cout_gaz_eur"]
-    cout_hybride = a["cout_hybride_eur"]
-    cop_med = a["cop_median"] if a["cop_median"] == a["cop_median"] else 0.0  # NaN guard
+# Le pilotage n'est recommandé que s'il apporte au moins 5 % de plus que l'hybride simple
+SEUIL_PILOTAGE = 0.95
+
+def codes_verdict(cout_pac, cout_gaz, cout_hybride, cop_median, cout_pilote=None):
+    """
+    Règles du verdict sur des tableaux : indice dans VERDICTS (0 PAC, 1 hybride,
+    2 chaudière, 3 hybride piloté). cout_pilote : NaN ou None si non simulé.
+    """
+    cout_gaz = np.asarray(cout_gaz, dtype=float)
+    cop_med = np.nan_to_num(np.asarray(cop_median, dtype=float), nan=0.0)  # NaN guard
 
     # Règles simples (Lite) — neutres et pédagogiques
-    if (cout_pac <= 0.75 * cout_gaz) and (cop_med >= 2.5):
-        return "🟢 PAC seule recommandée (économique et performante)"
-    elif (cout_hybride <= 0.90 * cout_gaz):
-        return "🔵 PAC hybride (en relève) recommandée"
-    else:
-        return "🟠 Conserver la chaudière (optimiser les réglages d’abord)"
+    pac = (np.asarray(cout_pac) <= 0.75 * cout_gaz) & (cop_med >= 2.5)
+    hybride = np.asarray(cout_hybride) <= 0.90 * cout_gaz
+    code = np.where(pac, 0, np.where(hybride, 1, 2))
+    if cout_pilote is not None:
+        pilote = np.nan_to_num(np.asarray(cout_pilote, dtype=float), nan=np.inf)
+        pilote = (pilote <= 0.90 * cout_gaz) & (pilote <= SEUIL_PILOTAGE * np.asarray(cout_hybride))
+        code = np.where(~pac & pilote, 3, code)
+    return code.astype(np.int8)
+
+def recommander_solution(resultats: dict, client: dict) -> str:
+    a = resultats["aggregats"]
+    code = codes_verdict(a["cout_pac_eur"], a["cout_gaz_eur"], a["cout_hybride_eur"], a["cop_median"],
+                         a.get("cout_pilote_eur"))
+    return VERDICTS[int(code)]